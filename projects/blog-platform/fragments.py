@@ -0,0 +1,102 @@
+"""Fragment caching for Jinja templates.
+
+Adds a ``{% cache %}`` tag that stores the rendered output of a block under a
+key built from its arguments:
+
+    {% cache 'post-card', post[0], post[4] %}
+        ... expensive markup ...
+    {% endcache %}
+
+The first argument is the fragment's namespace; invalidate() drops every
+fragment of a namespace at once.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+class FragmentCache:
+    """An LRU cache of rendered fragments bounded by their size in memory"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._fragments = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is None:
+                self.misses += 1
+                return None
+            self._fragments.move_to_end(key)
+            self.hits += 1
+            return fragment
+
+    def set(self, key, fragment):
+        fragment_size = sys.getsizeof(fragment)
+        if fragment_size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._fragments.pop(key, None)
+            if old is not None:
+                self.size -= sys.getsizeof(old)
+
+            self._fragments[key] = fragment
+            self.size += fragment_size
+
+            while self.size > self.max_bytes:
+                _, evicted = self._fragments.popitem(last=False)
+                self.size -= sys.getsizeof(evicted)
+
+    def invalidate(self, namespace):
+        """Drop every fragment whose key starts with namespace"""
+        with self._lock:
+            for key in [key for key in self._fragments if key[0] == namespace]:
+                self.size -= sys.getsizeof(self._fragments.pop(key))
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+            self.size = 0
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja extension implementing the {% cache key, ... %} tag"""
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        # The application assigns the FragmentCache instance to use
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(key)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+
+        key = tuple(key)
+        fragment = cache.get(key)
+        if fragment is None:
+            fragment = caller()
+            cache.set(key, fragment)
+        return fragment
@@ -0,0 +1,108 @@
+"""Threaded HTTP load test for the blog platform.
+
+Sends GET requests from a number of client threads for a fixed duration and
+reports throughput and latency percentiles. Start the app first, then e.g.:
+
+    python loadtest.py --seed 10000          # fill blog.db with sample posts
+    python loadtest.py http://127.0.0.1:5000/ --threads 16 --duration 20
+
+Run it against the old and new versions of the app to compare them.
+"""
+import argparse
+import http.client
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def seed(database: str, count: int):
+    """Insert sample posts directly into the database"""
+    conn = sqlite3.connect(database)
+    conn.execute('''CREATE TABLE IF NOT EXISTS posts
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     title TEXT NOT NULL,
+                     content TEXT NOT NULL,
+                     author TEXT NOT NULL,
+                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    conn.executemany('INSERT INTO posts (title, content, author) VALUES (?, ?, ?)',
+                     [(f'Sample post {i}', 'Lorem ipsum dolor sit amet. ' * 40, 'loadtest')
+                      for i in range(count)])
+    conn.commit()
+    conn.close()
+    print(f"Inserted {count} posts into {database}")
+
+
+def worker(url: str, deadline: float, latencies: list, errors: list):
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    # One keep-alive connection per thread, like a browser or crawler
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+            else:
+                latencies.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    conn.close()
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(url: str, threads: int, duration: float):
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+
+    pool = [threading.Thread(target=worker, args=(url, deadline, latencies, errors))
+            for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"URL:        {url}")
+    print(f"Threads:    {threads}")
+    print(f"Requests:   {len(latencies)} ok, {len(errors)} errors in {elapsed:.1f}s")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} requests/s")
+    print(f"Latency:    p50 {percentile(latencies, 0.50) * 1000:.1f} ms, "
+          f"p90 {percentile(latencies, 0.90) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the blog platform')
+    parser.add_argument('url', nargs='?', default='http://127.0.0.1:5000/', help='URL to request')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent client threads')
+    parser.add_argument('--duration', type=float, default=10, help='test length in seconds')
+    parser.add_argument('--seed', type=int, metavar='N', help='insert N sample posts and exit')
+    parser.add_argument('--db', default='blog.db', help='database used by --seed')
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.db, args.seed)
+    else:
+        run(args.url, args.threads, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,197 @@
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, render_template, request, redirect, url_for, g
+from jinja2 import FileSystemBytecodeCache
+import os
 import sqlite3
-from datetime import datetime
+import queue
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from fragments import FragmentCache, FragmentCacheExtension
 
 app = Flask(__name__)
+app.config['DATABASE'] = 'blog.db'
+app.config['POSTS_PER_PAGE'] = 10
+app.config['POOL_SIZE'] = 8
+app.config['PAGE_CACHE_SIZE'] = 256
+app.config['FRAGMENT_CACHE_BYTES'] = 16 * 1024 * 1024
+app.config['RECENT_POSTS'] = 5
+# Directory for compiled template bytecode; None uses a per-user temp directory.
+# Taken from the environment: templates are compiled into it on import, so
+# changing this key afterwards has no effect.
+app.config['JINJA_BYTECODE_CACHE_DIR'] = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+
+# Must be set before app.jinja_env is first created
+app.jinja_options = {
+    **app.jinja_options,
+    'extensions': [*app.jinja_options.get('extensions', ()), FragmentCacheExtension],
+    'bytecode_cache': FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR']),
+}
+
+class ConnectionPool:
+    """A small thread-safe pool of SQLite connections"""
+
+    def __init__(self, database, size):
+        self.database = database
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Connections move between request threads, so disable the same-thread check
+        conn = sqlite3.connect(self.database, timeout=30, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        return conn
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._connect()
+
+        # Pool exhausted: wait for a connection to be released
+        return self._idle.get()
+
+    def release(self, conn):
+        # Never hand the next request a connection with an open transaction
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.database != app.config['DATABASE']:
+            _pool = ConnectionPool(app.config['DATABASE'], app.config['POOL_SIZE'])
+        return _pool
+
+def get_db():
+    """Return the connection of the current request, borrowing one from the pool"""
+    if 'db' not in g:
+        g.db = get_pool().acquire()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exception):
+    conn = g.pop('db', None)
+    if conn is not None:
+        get_pool().release(conn)
+
+class PageCache:
+    """A bounded LRU cache of rendered pages"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            html = self._pages.get(key)
+            if html is not None:
+                self._pages.move_to_end(key)
+            return html
+
+    def set(self, key, html):
+        with self._lock:
+            self._pages[key] = html
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+page_cache = PageCache(app.config['PAGE_CACHE_SIZE'])
+fragment_cache = FragmentCache(app.config['FRAGMENT_CACHE_BYTES'])
+app.jinja_env.fragment_cache = fragment_cache
+
+def precompile_templates():
+    """Compile every template up front so the first requests don't pay for it
+
+    Compiled code is also written to the bytecode cache, which lets freshly
+    started workers skip parsing altogether.
+    """
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+
+@app.context_processor
+def inject_recent_posts():
+    def recent_posts():
+        # Called from inside the cached sidebar fragment, so it only runs on a miss
+        c = get_db().cursor()
+        c.execute('''SELECT id, title FROM posts
+                     ORDER BY created_at DESC, id DESC
+                     LIMIT ?''', (app.config['RECENT_POSTS'],))
+        return c.fetchall()
+
+    # Part of the sidebar fragment's key, so a post created by any worker
+    # retires the cached sidebar everywhere
+    return {'recent_posts': recent_posts, 'sidebar_version': posts_version()}
+
+def posts_version():
+    """(MAX(id), MAX(created_at)) of the posts; changes whenever a post is added"""
+    if 'posts_version' not in g:
+        c = get_db().cursor()
+        # Separate subqueries so each MAX() is a single index lookup
+        c.execute('SELECT (SELECT MAX(id) FROM posts), (SELECT MAX(created_at) FROM posts)')
+        g.posts_version = c.fetchone()
+    return g.posts_version
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+def parse_timestamp(value):
+    """Convert a SQLite CURRENT_TIMESTAMP (UTC) string to an aware datetime"""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+def conditional_page(key, etag, last_modified, render):
+    """Answer with 304 if the client's copy is current, else serve a cached or fresh render
+
+    Entries are keyed by ETag as well, so a page whose data changed is never
+    served from a stale entry even if another worker made the change.
+    """
+    if request.if_none_match:
+        # If-None-Match uses weak comparison (RFC 7232 3.2), so proxies that
+        # weaken the ETag, e.g. when compressing, still get 304s
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = (last_modified is not None and request.if_modified_since is not None
+                        and last_modified <= request.if_modified_since)
+
+    if not_modified:
+        response = app.response_class(status=304)
+    else:
+        html = page_cache.get((key, etag))
+        if html is None:
+            html = render()
+            page_cache.set((key, etag), html)
+        response = app.response_class(html)
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Let browsers and proxies store the page but revalidate it on every use
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
 
 # Database setup
 def init_db():
-    conn = sqlite3.connect('blog.db')
+    conn = sqlite3.connect(app.config['DATABASE'])
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS posts
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -14,28 +199,45 @@ def init_db():
                   content TEXT NOT NULL,
                   author TEXT NOT NULL,
                   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts (created_at DESC, id DESC)')
     conn.commit()
     conn.close()
 
 @app.route('/')
 def index():
-    conn = sqlite3.connect('blog.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM posts ORDER BY created_at DESC')
-    posts = c.fetchall()
-    conn.close()
-    return render_template('index.html', posts=posts)
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        page = 1
+    per_page = app.config['POSTS_PER_PAGE']
+
+    c = get_db().cursor()
+    max_id, max_created_at = posts_version()
+    etag = make_etag('index', page, per_page, max_id, max_created_at)
+
+    def render():
+        # Fetch one extra row to know whether there is a next page
+        c.execute('''SELECT id, title, content, author, created_at FROM posts
+                     ORDER BY created_at DESC, id DESC
+                     LIMIT ? OFFSET ?''', (per_page + 1, (page - 1) * per_page))
+        posts = c.fetchall()
+
+        has_next = len(posts) > per_page
+        return render_template('index.html', posts=posts[:per_page], page=page, has_next=has_next)
+
+    return conditional_page(('index', page), etag, parse_timestamp(max_created_at), render)
 
 @app.route('/post/<int:post_id>')
 def post_detail(post_id):
-    conn = sqlite3.connect('blog.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM posts WHERE id = ?', (post_id,))
+    c = get_db().cursor()
+    c.execute('SELECT id, title, content, author, created_at FROM posts WHERE id = ?', (post_id,))
     post = c.fetchone()
-    conn.close()
-    
+
     if post:
-        return render_template('post_detail.html', post=post)
+        # The page's sidebar lists recent posts, so a new post changes it too
+        max_id, max_created_at = posts_version()
+        return conditional_page(('post', post_id), make_etag('post', post, max_id, max_created_at),
+                                parse_timestamp(max(post[4], max_created_at)),
+                                lambda: render_template('post_detail.html', post=post))
     else:
         return "Post not found", 404
 
@@ -45,22 +247,27 @@ def create_post():
         title = request.form['title']
         content = request.form['content']
         author = request.form['author']
-        
-        conn = sqlite3.connect('blog.db')
-        c = conn.cursor()
-        c.execute('INSERT INTO posts (title, content, author) VALUES (?, ?, ?)',
-                  (title, content, author))
+
+        conn = get_db()
+        conn.execute('INSERT INTO posts (title, content, author) VALUES (?, ?, ?)',
+                     (title, content, author))
         conn.commit()
-        conn.close()
-        
+        # Entries for the old ETags can never be served again; free them now
+        page_cache.clear()
+        # Post cards are keyed per post and stay valid. The sidebar is keyed
+        # on the newest post, so other workers miss it too; drop ours now
+        fragment_cache.invalidate('sidebar')
+
         return redirect(url_for('index'))
-    
+
     return render_template('create_post.html')
 
 @app.route('/about')
 def about():
     return render_template('about.html')
 
+precompile_templates()
+
 if __name__ == '__main__':
     init_db()
     app.run(debug=True)
@@ -0,0 +1,94 @@
+"""Benchmark for ContactManager.
+
+Fills a scratch database with synthetic contacts and times the calls the CRM
+front-end makes most often. Compare against the previous version by running
+the same command on a checkout of it.
+
+    python benchmark.py --contacts 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import time
+
+from main import ContactManager
+
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda',
+               'William', 'Elizabeth', 'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+              'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson']
+TAG_COUNT = 200
+
+
+def populate(db_name: str, contact_count: int, batch_size: int = 50000):
+    """Insert synthetic contacts and tags directly with executemany"""
+    rng = random.Random(42)
+    conn = sqlite3.connect(db_name)
+    c = conn.cursor()
+
+    c.executemany('INSERT INTO tags (name) VALUES (?)', [(f'tag-{i}',) for i in range(TAG_COUNT)])
+
+    for first in range(1, contact_count + 1, batch_size):
+        ids = range(first, min(first + batch_size, contact_count + 1))
+        c.executemany('''INSERT INTO contacts (id, first_name, last_name, email, phone, company, title)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                      [(i, rng.choice(FIRST_NAMES), f'{rng.choice(LAST_NAMES)}{i % 997}',
+                        f'user{i}@example.com', f'+1 555 {i % 10000000:07d}',
+                        f'Company {i % 5000}', 'Engineer')
+                       for i in ids])
+        # Three random tags per contact
+        c.executemany('INSERT OR IGNORE INTO contact_tags (contact_id, tag_id) VALUES (?, ?)',
+                      [(i, tag) for i in ids for tag in rng.sample(range(1, TAG_COUNT + 1), 3)])
+        conn.commit()
+
+    conn.close()
+
+
+def timed(label: str, func, calls: int = 1):
+    started = time.perf_counter()
+    # ContactManager reports each operation with print(); keep the table readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(calls):
+            func()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<45} {elapsed / calls * 1000:>10.3f} ms/call  ({calls} calls)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ContactManager')
+    parser.add_argument('--contacts', type=int, default=1000000, help='number of contacts to generate')
+    parser.add_argument('--calls', type=int, default=2000, help='calls per point lookup benchmark')
+    parser.add_argument('--db', default='benchmark_contacts.db', help='scratch database file')
+    parser.add_argument('--keep', action='store_true', help='reuse an existing scratch database')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db) and not args.keep:
+        os.remove(args.db)
+
+    fresh = not os.path.exists(args.db)
+    manager = ContactManager(args.db)
+
+    if fresh:
+        print(f"Generating {args.contacts} contacts...")
+        started = time.perf_counter()
+        populate(args.db, args.contacts)
+        print(f"Generated in {time.perf_counter() - started:.1f}s\n")
+
+    rng = random.Random(7)
+    timed('get_contact (random id)',
+          lambda: manager.get_contact(rng.randint(1, args.contacts)), args.calls)
+    timed('update_contact (random id)',
+          lambda: manager.update_contact(rng.randint(1, args.contacts), title='Manager'), args.calls // 10)
+    timed('search_contacts(tag=tag-7)', lambda: manager.search_contacts(tag='tag-7'), 3)
+    timed("search_contacts('Company 42')",
+          lambda: manager.search_contacts('Company 42'), 3)
+    for term in ('smi', 'Smith42', 'user1234'):
+        timed(f"search_contacts_page('{term}', limit=10)",
+              lambda: manager.search_contacts_page(term, 10), 50)
+
+
+if __name__ == '__main__':
+    main()
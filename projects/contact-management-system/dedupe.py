@@ -0,0 +1,244 @@
+"""Duplicate contact detection for ContactManager.
+
+Contacts are reduced to normalized records (digits-only phone numbers, email
+local parts without dots or +suffixes, lowercased names) and grouped into
+blocks that share a key: the same phone number, the same email local part,
+or the same name prefix and initial. Only contacts within a block are
+compared, so the work grows with the size of the blocks rather than with the
+square of the number of contacts. Blocks larger than MAX_BLOCK_SIZE are
+compared with a sliding window over their name-sorted members. Blocks are
+scored in parallel across worker processes.
+
+Used through ContactManager.find_duplicates(), or from the command line:
+
+    python dedupe.py --db contacts.db --threshold 0.85 --workers 4
+"""
+import argparse
+import os
+import re
+import unicodedata
+from multiprocessing import Pool
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Contacts sharing a blocking key are compared pairwise up to this block
+# size; larger blocks only compare each contact with its WINDOW neighbours.
+MAX_BLOCK_SIZE = 500
+WINDOW = 20
+
+# Local parts shared by unrelated people, useless as evidence
+GENERIC_LOCAL_PARTS = {'admin', 'contact', 'hello', 'info', 'mail', 'office', 'sales', 'support'}
+
+# A phone number needs at least this many digits to identify anyone
+MIN_PHONE_DIGITS = 7
+
+NON_ALNUM = re.compile(r'[^a-z0-9]')
+
+# (id, first name, last name, email local part, phone, company), normalized
+Record = Tuple[int, str, str, Optional[str], Optional[str], Optional[str]]
+# (lower id, higher id, score, reasons)
+Pair = Tuple[int, int, float, Tuple[str, ...]]
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase text and strip accents, spaces and punctuation"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode()
+    return NON_ALNUM.sub('', text.lower())
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Keep the last ten digits of a phone number, dropping country codes"""
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) < MIN_PHONE_DIGITS:
+        return None
+    return digits[-10:]
+
+
+def email_local_part(email: Optional[str]) -> Optional[str]:
+    """Get the comparable local part of an email: no dots, no +suffix"""
+    if not email or '@' not in email:
+        return None
+    local = email.rsplit('@', 1)[0].lower().split('+', 1)[0].replace('.', '')
+    if not local or local in GENERIC_LOCAL_PARTS:
+        return None
+    return local
+
+
+def to_record(contact_id: int, first_name: str, last_name: str, email: Optional[str],
+              phone: Optional[str], company: Optional[str]) -> Record:
+    return (contact_id, normalize_text(first_name), normalize_text(last_name),
+            email_local_part(email), normalize_phone(phone), normalize_text(company) or None)
+
+
+def jaro_winkler(a: str, b: str, prefix_scale: float = 0.1) -> float:
+    """Jaro-Winkler similarity of two strings, from 0.0 to 1.0"""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+
+    distance = max(len(a), len(b)) // 2 - 1
+    a_matched = [False] * len(a)
+    b_matched = [False] * len(b)
+    matches = 0
+    for i, char in enumerate(a):
+        for j in range(max(0, i - distance), min(len(b), i + distance + 1)):
+            if not b_matched[j] and b[j] == char:
+                a_matched[i] = b_matched[j] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+
+    a_chars = [char for char, matched in zip(a, a_matched) if matched]
+    b_chars = [char for char, matched in zip(b, b_matched) if matched]
+    transpositions = sum(x != y for x, y in zip(a_chars, b_chars)) / 2
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * prefix_scale * (1 - jaro)
+
+
+def name_similarity(a: Record, b: Record) -> float:
+    """Average first and last name similarity, allowing swapped names"""
+    straight = (jaro_winkler(a[1], b[1]) + jaro_winkler(a[2], b[2])) / 2
+    swapped = (jaro_winkler(a[1], b[2]) + jaro_winkler(a[2], b[1])) / 2
+    return max(straight, swapped)
+
+
+def score_pair(a: Record, b: Record, threshold: float = 0.0) -> Tuple[float, Tuple[str, ...]]:
+    """Score how likely two contacts are the same person
+
+    A shared phone number or email local part is strong evidence, weighted by
+    how similar the names are. On names alone a pair scores at most 0.8,
+    or 0.95 when the company matches too. Pairs that cannot reach threshold
+    score 0.0 without comparing names.
+    """
+    reasons = []
+    if a[4] and a[4] == b[4]:
+        reasons.append('phone')
+    if a[3] and a[3] == b[3]:
+        reasons.append('email')
+    if a[5] and a[5] == b[5]:
+        reasons.append('company')
+
+    if 'phone' in reasons or 'email' in reasons:
+        base, weight = 0.6 + (0.1 if len(reasons) > 1 else 0.0), 0.4
+    else:
+        base, weight = (0.15 if reasons else 0.0), 0.8
+    if base + weight < threshold:
+        return 0.0, ()
+
+    return min(base + weight * name_similarity(a, b), 1.0), tuple(reasons)
+
+
+def blocking_keys(record: Record) -> List[str]:
+    keys = []
+    if record[4]:
+        keys.append(f'phone:{record[4]}')
+    if record[3]:
+        keys.append(f'email:{record[3]}')
+    if record[1] or record[2]:
+        # Order the names so swapped first and last names share a block
+        first, last = sorted((record[1], record[2]))
+        keys.append(f'name:{first[:4]}:{last[:1]}')
+    return keys
+
+
+def build_blocks(records: Iterable[Record]) -> List[List[Record]]:
+    """Group records by blocking key, keeping blocks with two or more members"""
+    blocks: Dict[str, List[Record]] = {}
+    for record in records:
+        for key in blocking_keys(record):
+            blocks.setdefault(key, []).append(record)
+    return [block for block in blocks.values() if len(block) > 1]
+
+
+def compare_block(args: Tuple[List[Record], float]) -> List[Pair]:
+    """Score the candidate pairs of one block, keeping those above threshold"""
+    block, threshold = args
+    if len(block) <= MAX_BLOCK_SIZE:
+        candidates = ((block[i], block[j]) for i in range(len(block)) for j in range(i + 1, len(block)))
+    else:
+        # Sorted neighbourhood: similar names sort close together
+        block = sorted(block, key=lambda record: (record[2], record[1]))
+        candidates = ((block[i], block[j]) for i in range(len(block))
+                      for j in range(i + 1, min(i + WINDOW, len(block))))
+
+    pairs = []
+    for a, b in candidates:
+        score, reasons = score_pair(a, b, threshold)
+        if score >= threshold:
+            low, high = sorted((a[0], b[0]))
+            pairs.append((low, high, round(score, 3), reasons))
+    return pairs
+
+
+def find_duplicate_pairs(records: Iterable[Record], threshold: float = 0.85,
+                         workers: Optional[int] = None) -> List[Pair]:
+    """Find probable duplicate pairs, best matches first
+
+    workers defaults to the number of CPUs; with one worker the blocks are
+    compared in this process.
+    """
+    blocks = build_blocks(records)
+    workers = workers or os.cpu_count() or 1
+
+    tasks = [(block, threshold) for block in blocks]
+    if workers > 1 and len(tasks) > 1:
+        with Pool(workers) as pool:
+            results = pool.imap_unordered(compare_block, tasks, chunksize=64)
+            found = [pair for pairs in results for pair in pairs]
+    else:
+        found = [pair for task in tasks for pair in compare_block(task)]
+
+    # A pair can share several blocks; keep it once
+    unique = {}
+    for pair in found:
+        unique[pair[:2]] = pair
+    return sorted(unique.values(), key=lambda pair: (-pair[2], pair[0], pair[1]))
+
+
+def group_pairs(pairs: Iterable[Pair]) -> List[List[int]]:
+    """Merge overlapping pairs into groups of contact IDs (union-find)"""
+    parent: Dict[int, int] = {}
+
+    def find(contact_id):
+        parent.setdefault(contact_id, contact_id)
+        while parent[contact_id] != contact_id:
+            parent[contact_id] = parent[parent[contact_id]]
+            contact_id = parent[contact_id]
+        return contact_id
+
+    for low, high, _, _ in pairs:
+        parent[find(high)] = find(low)
+
+    groups: Dict[int, List[int]] = {}
+    for contact_id in parent:
+        groups.setdefault(find(contact_id), []).append(contact_id)
+    return sorted(sorted(group) for group in groups.values())
+
+
+def main():
+    from main import ContactManager
+
+    parser = argparse.ArgumentParser(description='Find probable duplicate contacts')
+    parser.add_argument('--db', default='contacts.db', help='contacts database')
+    parser.add_argument('--threshold', type=float, default=0.85, help='minimum score, 0 to 1')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: CPUs)')
+    args = parser.parse_args()
+
+    manager = ContactManager(args.db)
+    pairs = manager.find_duplicates(args.threshold, args.workers)
+    for low, high, score, reasons in pairs:
+        print(f"{low}\t{high}\t{score:.3f}\t{','.join(reasons) or 'name'}")
+    print(f"{len(pairs)} probable duplicate pairs in {len(group_pairs(pairs))} groups")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,59 +2,236 @@ import sqlite3
 import json
 from datetime import datetime
 import csv
+import gzip
+import itertools
 import re
-from typing import List, Dict, Optional
+import queue
+import threading
+from typing import List, Dict, Optional, Tuple
+
+from dedupe import find_duplicate_pairs, group_pairs, to_record
+from tag_index import TagIndex
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# Each entry is a list of statements; never edit an entry once released,
+# append a new one instead.
+MIGRATIONS = [
+    # 1: indexes for name ordering, company lookups and tag filters
+    ['CREATE INDEX IF NOT EXISTS idx_contacts_name ON contacts (last_name, first_name)',
+     'CREATE INDEX IF NOT EXISTS idx_contacts_company ON contacts (company)',
+     'CREATE INDEX IF NOT EXISTS idx_contact_tags_tag ON contact_tags (tag_id, contact_id)'],
+    # 2: trigram full-text index over the searchable fields (needs SQLite 3.34+)
+    ['''CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5
+        (first_name, last_name, email, company,
+         content='contacts', content_rowid='id', tokenize='trigram')''',
+     '''CREATE TRIGGER IF NOT EXISTS trg_contacts_fts_insert AFTER INSERT ON contacts
+        BEGIN
+            INSERT INTO contacts_fts (rowid, first_name, last_name, email, company)
+            VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.email, NEW.company);
+        END''',
+     '''CREATE TRIGGER IF NOT EXISTS trg_contacts_fts_delete AFTER DELETE ON contacts
+        BEGIN
+            INSERT INTO contacts_fts (contacts_fts, rowid, first_name, last_name, email, company)
+            VALUES ('delete', OLD.id, OLD.first_name, OLD.last_name, OLD.email, OLD.company);
+        END''',
+     '''CREATE TRIGGER IF NOT EXISTS trg_contacts_fts_update
+        AFTER UPDATE OF first_name, last_name, email, company ON contacts
+        BEGIN
+            INSERT INTO contacts_fts (contacts_fts, rowid, first_name, last_name, email, company)
+            VALUES ('delete', OLD.id, OLD.first_name, OLD.last_name, OLD.email, OLD.company);
+            INSERT INTO contacts_fts (rowid, first_name, last_name, email, company)
+            VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.email, NEW.company);
+        END''',
+     "INSERT INTO contacts_fts (contacts_fts) VALUES ('rebuild')"],
+]
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+# Basic validation - allow various formats
+PHONE_PATTERN = re.compile(r'^[\d\s\-\+\(\)\.]{10,20}$')
+
+# Editable contact columns, in table order
+CONTACT_FIELDS = ['first_name', 'last_name', 'email', 'phone', 'address', 'company', 'title', 'notes']
+
+# Columns export_contacts can write, and the ones it writes by default
+EXPORT_COLUMNS = {
+    'id': 'c.id',
+    'first_name': 'c.first_name',
+    'last_name': 'c.last_name',
+    'email': 'c.email',
+    'phone': 'c.phone',
+    'address': 'c.address',
+    'company': 'c.company',
+    'title': 'c.title',
+    'notes': 'c.notes',
+    'created_at': 'c.created_at',
+    'updated_at': 'c.updated_at',
+    'tags': '''(SELECT GROUP_CONCAT(t.name, ', ')
+              FROM contact_tags ct
+              JOIN tags t ON ct.tag_id = t.id
+              WHERE ct.contact_id = c.id)''',
+}
+DEFAULT_EXPORT_COLUMNS = ['id', 'first_name', 'last_name', 'email', 'phone',
+                          'address', 'company', 'title', 'notes', 'tags']
+
+# Largest number of values bound into a single IN (...) list; older SQLite
+# builds cap a statement at 999 parameters.
+IN_CHUNK_SIZE = 500
+
+# The trigram tokenizer cannot match search terms shorter than this
+TRIGRAM_LENGTH = 3
+
+# search_contacts_page ranks at most this many matches; ranking cost grows
+# with the number of matches, and for broader searches rank is mostly noise
+RANK_WINDOW = 2000
+
+# bm25 column weights for contacts_fts: names rank above email and company
+FTS_RANK = 'bm25(contacts_fts, 4.0, 4.0, 2.0, 1.0)'
+
+# Applied to every pooled connection
+CONNECTION_PRAGMAS = [
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA busy_timeout = 5000',
+    'PRAGMA cache_size = -65536',     # 64 MB page cache
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA mmap_size = 268435456',   # 256 MB memory-mapped I/O
+]
+
+# Columns selected for a contact; tags are aggregated per row so listing
+# queries never GROUP BY the whole contacts table.
+CONTACT_COLUMNS = '''c.id, c.first_name, c.last_name, c.email, c.phone, c.address, c.company,
+                     c.title, c.notes, c.created_at, c.updated_at,
+                     (SELECT GROUP_CONCAT(t.name, ', ')
+                      FROM contact_tags ct
+                      JOIN tags t ON ct.tag_id = t.id
+                      WHERE ct.contact_id = c.id) AS tags'''
+
+class ConnectionPool:
+    """A thread-safe pool of SQLite connections sharing one database file"""
+    
+    def __init__(self, db_name: str, size: int = 8):
+        self.db_name = db_name
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> sqlite3.Connection:
+        # Connections move between threads, so disable the same-thread check
+        conn = sqlite3.connect(self.db_name, timeout=30, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def acquire(self) -> sqlite3.Connection:
+        """Borrow a connection, opening a new one while below the pool size"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._connect()
+        
+        # Pool exhausted: wait for a connection to be released
+        return self._idle.get()
+    
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection, discarding any uncommitted changes"""
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+    
+    def close(self):
+        """Close all idle connections"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
 
 class ContactManager:
-    def __init__(self, db_name='contacts.db'):
+    def __init__(self, db_name='contacts.db', pool_size: int = 8):
         self.db_name = db_name
+        self.pool = ConnectionPool(db_name, pool_size)
+        # Built on the first tag query, see tag_index.py
+        self._tag_index = None
+        self._tag_index_lock = threading.Lock()
         self.init_db()
     
     def init_db(self):
         """Initialize the database"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        conn = self.pool.acquire()
+        try:
+            c = conn.cursor()
+            
+            # Create contacts table
+            c.execute('''CREATE TABLE IF NOT EXISTS contacts
+                         (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                          first_name TEXT NOT NULL,
+                          last_name TEXT NOT NULL,
+                          email TEXT UNIQUE,
+                          phone TEXT,
+                          address TEXT,
+                          company TEXT,
+                          title TEXT,
+                          notes TEXT,
+                          created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                          updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+            
+            # Create tags table
+            c.execute('''CREATE TABLE IF NOT EXISTS tags
+                         (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                          name TEXT UNIQUE NOT NULL)''')
+            
+            # Create contact_tags junction table
+            c.execute('''CREATE TABLE IF NOT EXISTS contact_tags
+                         (contact_id INTEGER,
+                          tag_id INTEGER,
+                          PRIMARY KEY (contact_id, tag_id),
+                          FOREIGN KEY (contact_id) REFERENCES contacts (id),
+                          FOREIGN KEY (tag_id) REFERENCES tags (id))''')
+            
+            conn.commit()
+            self.migrate_db(conn)
+        finally:
+            self.pool.release(conn)
+    
+    def migrate_db(self, conn: sqlite3.Connection):
+        """Apply pending schema migrations
         
-        # Create contacts table
-        c.execute('''CREATE TABLE IF NOT EXISTS contacts
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      first_name TEXT NOT NULL,
-                      last_name TEXT NOT NULL,
-                      email TEXT UNIQUE,
-                      phone TEXT,
-                      address TEXT,
-                      company TEXT,
-                      title TEXT,
-                      notes TEXT,
-                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                      updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-        
-        # Create tags table
-        c.execute('''CREATE TABLE IF NOT EXISTS tags
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      name TEXT UNIQUE NOT NULL)''')
-        
-        # Create contact_tags junction table
-        c.execute('''CREATE TABLE IF NOT EXISTS contact_tags
-                     (contact_id INTEGER,
-                      tag_id INTEGER,
-                      PRIMARY KEY (contact_id, tag_id),
-                      FOREIGN KEY (contact_id) REFERENCES contacts (id),
-                      FOREIGN KEY (tag_id) REFERENCES tags (id))''')
-        
-        conn.commit()
-        conn.close()
+        Each migration runs in an explicit transaction with its user_version
+        bump. sqlite3 would otherwise run DDL such as ALTER TABLE outside
+        any transaction, so a migration interrupted partway left changes
+        that the next startup tried to apply again. BEGIN IMMEDIATE also
+        keeps processes starting together from applying one twice.
+        """
+        while conn.execute('PRAGMA user_version').fetchone()[0] < len(MIGRATIONS):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Another process may have migrated since the check above
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+                if version < len(MIGRATIONS):
+                    for statement in MIGRATIONS[version]:
+                        conn.execute(statement)
+                    # PRAGMA does not accept bound parameters
+                    conn.execute(f'PRAGMA user_version = {version + 1}')
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
     
     def validate_email(self, email: str) -> bool:
         """Validate email format"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return EMAIL_PATTERN.match(email) is not None
     
     def validate_phone(self, phone: str) -> bool:
         """Validate phone number format"""
-        # Basic validation - allow various formats
-        pattern = r'^[\d\s\-\+\(\)\.]{10,20}$'
-        return re.match(pattern, phone) is not None
+        return PHONE_PATTERN.match(phone) is not None
     
     def add_contact(self, first_name: str, last_name: str, email: str = None, 
                    phone: str = None, address: str = None, company: str = None, 
@@ -72,7 +249,7 @@ class ContactManager:
             print("Invalid phone format")
             return None
         
-        conn = sqlite3.connect(self.db_name)
+        conn = self.pool.acquire()
         c = conn.cursor()
         
         try:
@@ -83,6 +260,8 @@ class ContactManager:
             
             contact_id = c.lastrowid
             conn.commit()
+            if self._tag_index:
+                self._tag_index.add_contact(contact_id)
             print(f"Contact added successfully (ID: {contact_id})")
             return contact_id
             
@@ -90,7 +269,7 @@ class ContactManager:
             print("Email already exists in database")
             return None
         finally:
-            conn.close()
+            self.pool.release(conn)
     
     def update_contact(self, contact_id: int, **kwargs) -> bool:
         """Update contact information"""
@@ -119,10 +298,10 @@ class ContactManager:
             print("No valid fields to update")
             return False
         
-        update_values.append(contact_id)
         update_values.append(datetime.now().isoformat())
+        update_values.append(contact_id)
         
-        conn = sqlite3.connect(self.db_name)
+        conn = self.pool.acquire()
         c = conn.cursor()
         
         try:
@@ -143,98 +322,165 @@ class ContactManager:
             print("Email already exists in database")
             return False
         finally:
-            conn.close()
+            self.pool.release(conn)
     
     def delete_contact(self, contact_id: int) -> bool:
         """Delete a contact"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        
-        # First delete associated tags
-        c.execute('DELETE FROM contact_tags WHERE contact_id = ?', (contact_id,))
-        
-        # Then delete the contact
-        c.execute('DELETE FROM contacts WHERE id = ?', (contact_id,))
-        
-        if c.rowcount == 0:
-            print("Contact not found")
-            conn.close()
-            return False
-        
-        conn.commit()
-        conn.close()
+        conn = self.pool.acquire()
+        try:
+            c = conn.cursor()
+            
+            # First delete associated tags
+            c.execute('DELETE FROM contact_tags WHERE contact_id = ?', (contact_id,))
+            
+            # Then delete the contact
+            c.execute('DELETE FROM contacts WHERE id = ?', (contact_id,))
+            
+            if c.rowcount == 0:
+                conn.rollback()
+                print("Contact not found")
+                return False
+            
+            conn.commit()
+        finally:
+            self.pool.release(conn)
+        if self._tag_index:
+            self._tag_index.remove_contact(contact_id)
         print("Contact deleted successfully")
         return True
     
     def search_contacts(self, search_term: str = None, tag: str = None) -> List[Dict]:
-        """Search contacts by name, email, or tag"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        """Search contacts by name, email, or tag
         
-        query = '''SELECT c.*, GROUP_CONCAT(t.name, ', ') as tags
-                   FROM contacts c
-                   LEFT JOIN contact_tags ct ON c.id = ct.contact_id
-                   LEFT JOIN tags t ON ct.tag_id = t.id'''
+        Every whitespace-separated word of search_term must appear somewhere
+        in the first name, last name, email or company.
+        """
+        query = f'SELECT {CONTACT_COLUMNS} FROM contacts c'
         
         conditions = []
         params = []
         
         if search_term:
-            conditions.append('''(c.first_name LIKE ? OR c.last_name LIKE ? 
-                                OR c.email LIKE ? OR c.company LIKE ?)''')
-            search_pattern = f'%{search_term}%'
-            params.extend([search_pattern, search_pattern, search_pattern, search_pattern])
+            match, like_terms = self._split_search_term(search_term)
+            if match:
+                conditions.append('c.id IN (SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH ?)')
+                params.append(match)
+            self._add_like_conditions(like_terms, conditions, params)
         
         if tag:
-            conditions.append('t.name = ?')
+            # Filtering in a subquery keeps the contact's other tags in the
+            # aggregated column and starts from the tag's index entries
+            conditions.append('''c.id IN (SELECT ct.contact_id FROM contact_tags ct
+                                       JOIN tags t ON ct.tag_id = t.id
+                                       WHERE t.name = ?)''')
             params.append(tag)
         
         if conditions:
             query += ' WHERE ' + ' AND '.join(conditions)
         
-        query += ' GROUP BY c.id ORDER BY c.last_name, c.first_name'
-        
-        c.execute(query, params)
-        contacts = []
+        if search_term:
+            # The matches are found by the full-text index (or a scan for very
+            # short terms); sorting them beats walking the whole name index
+            query += ' ORDER BY +c.last_name, c.first_name'
+        else:
+            query += ' ORDER BY c.last_name, c.first_name'
         
-        for row in c.fetchall():
-            contact = {
-                'id': row[0],
-                'first_name': row[1],
-                'last_name': row[2],
-                'email': row[3],
-                'phone': row[4],
-                'address': row[5],
-                'company': row[6],
-                'title': row[7],
-                'notes': row[8],
-                'created_at': row[9],
-                'updated_at': row[10],
-                'tags': row[11] if row[11] else ''
-            }
-            contacts.append(contact)
-        
-        conn.close()
+        conn = self.pool.acquire()
+        try:
+            contacts = [self._row_to_contact(row) for row in conn.execute(query, params)]
+        finally:
+            self.pool.release(conn)
         return contacts
     
-    def get_contact(self, contact_id: int) -> Optional[Dict]:
-        """Get a specific contact by ID"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        
-        c.execute('''SELECT c.*, GROUP_CONCAT(t.name, ', ') as tags
-                     FROM contacts c
-                     LEFT JOIN contact_tags ct ON c.id = ct.contact_id
-                     LEFT JOIN tags t ON ct.tag_id = t.id
-                     WHERE c.id = ?
-                     GROUP BY c.id''', (contact_id,))
+    def search_contacts_page(self, search_term: str, limit: int = 20,
+                             cursor: Optional[Tuple[float, int]] = None) -> Tuple[List[Dict], Optional[Tuple[float, int]]]:
+        """Get the best matches for search_term and the cursor of the next page
         
-        row = c.fetchone()
-        conn.close()
+        Up to RANK_WINDOW matches are ranked with bm25, names first. Broader
+        searches (a few common letters) are returned in insertion order, as is
+        a search made only of words shorter than three characters, which
+        match as prefixes. Pass the returned cursor back to fetch the next
+        page; it is None on the last page.
+        """
+        match, like_terms = self._split_search_term(search_term)
+        conditions = []
+        params = []
         
-        if not row:
-            return None
+        conn = self.pool.acquire()
+        try:
+            if match and self._count_matches(conn, match, RANK_WINDOW + 1) <= RANK_WINDOW:
+                query = f'''SELECT {CONTACT_COLUMNS}, r.score
+                            FROM (SELECT rowid AS id, {FTS_RANK} AS score
+                                  FROM contacts_fts WHERE contacts_fts MATCH ?) r
+                            JOIN contacts c ON c.id = r.id'''
+                params.append(match)
+                self._add_like_conditions(like_terms, conditions, params)
+                if cursor:
+                    conditions.append('(r.score, c.id) > (?, ?)')
+                    params.extend(cursor)
+                order = 'r.score, c.id'
+            else:
+                # Unranked: walk matches in rowid order and stop after one page.
+                # Ordering by the FTS rowid lets FTS5 return rows presorted.
+                if match:
+                    query = f'''SELECT {CONTACT_COLUMNS}, 0.0
+                                FROM contacts_fts f JOIN contacts c ON c.id = f.rowid'''
+                    conditions.append('contacts_fts MATCH ?')
+                    params.append(match)
+                    self._add_like_conditions(like_terms, conditions, params)
+                    order = 'f.rowid'
+                else:
+                    query = f'SELECT {CONTACT_COLUMNS}, 0.0 FROM contacts c'
+                    self._add_like_conditions(like_terms, conditions, params, prefix=True)
+                    order = 'c.id'
+                if cursor:
+                    conditions.append(f'{order} > ?')
+                    params.append(cursor[1])
+            
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            query += f' ORDER BY {order} LIMIT ?'
+            params.append(limit + 1)
+            
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            self.pool.release(conn)
         
+        contacts = [self._row_to_contact(row) for row in rows[:limit]]
+        if len(rows) <= limit:
+            return contacts, None
+        return contacts, (rows[limit - 1][12], rows[limit - 1][0])
+    
+    @staticmethod
+    def _count_matches(conn: sqlite3.Connection, match: str, cap: int) -> int:
+        """Count full-text matches, stopping at cap"""
+        return conn.execute('''SELECT COUNT(*) FROM (SELECT rowid FROM contacts_fts
+                                                    WHERE contacts_fts MATCH ? LIMIT ?)''',
+                            (match, cap)).fetchone()[0]
+    
+    @staticmethod
+    def _split_search_term(search_term: str) -> Tuple[Optional[str], List[str]]:
+        """Split a search into an FTS5 MATCH expression and words too short for it"""
+        words = search_term.split()
+        # Quoting makes each word a phrase, i.e. a plain substring for the trigram tokenizer
+        phrases = ['"' + word.replace('"', '""') + '"' for word in words if len(word) >= TRIGRAM_LENGTH]
+        short_words = [word for word in words if len(word) < TRIGRAM_LENGTH]
+        return (' AND '.join(phrases) or None), short_words
+    
+    @staticmethod
+    def _add_like_conditions(words: List[str], conditions: List[str], params: List,
+                             prefix: bool = False):
+        """Require each word to appear in a searchable field"""
+        for word in words:
+            conditions.append('''(c.first_name LIKE ? ESCAPE '\\' OR c.last_name LIKE ? ESCAPE '\\'
+                                OR c.email LIKE ? ESCAPE '\\' OR c.company LIKE ? ESCAPE '\\')''')
+            escaped = re.sub(r'([\\%_])', r'\\\1', word)
+            pattern = f'{escaped}%' if prefix else f'%{escaped}%'
+            params.extend([pattern] * 4)
+    
+    @staticmethod
+    def _row_to_contact(row) -> Dict:
+        """Convert a row selected with CONTACT_COLUMNS to a contact dict"""
         return {
             'id': row[0],
             'first_name': row[1],
@@ -250,9 +496,23 @@ class ContactManager:
             'tags': row[11] if row[11] else ''
         }
     
+    def get_contact(self, contact_id: int) -> Optional[Dict]:
+        """Get a specific contact by ID"""
+        conn = self.pool.acquire()
+        try:
+            row = conn.execute(f'SELECT {CONTACT_COLUMNS} FROM contacts c WHERE c.id = ?',
+                               (contact_id,)).fetchone()
+        finally:
+            self.pool.release(conn)
+        
+        if not row:
+            return None
+        
+        return self._row_to_contact(row)
+    
     def add_tag(self, contact_id: int, tag_name: str) -> bool:
         """Add a tag to a contact"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self.pool.acquire()
         c = conn.cursor()
         
         try:
@@ -271,7 +531,6 @@ class ContactManager:
                       (contact_id, tag_id))
             if c.fetchone():
                 print("Tag already assigned to contact")
-                conn.close()
                 return False
             
             # Add the relationship
@@ -279,6 +538,8 @@ class ContactManager:
                       (contact_id, tag_id))
             
             conn.commit()
+            if self._tag_index:
+                self._tag_index.add_tag(contact_id, tag_name)
             print(f"Tag '{tag_name}' added to contact")
             return True
             
@@ -286,11 +547,11 @@ class ContactManager:
             print("Invalid contact ID")
             return False
         finally:
-            conn.close()
+            self.pool.release(conn)
     
     def remove_tag(self, contact_id: int, tag_name: str) -> bool:
         """Remove a tag from a contact"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self.pool.acquire()
         c = conn.cursor()
         
         try:
@@ -313,78 +574,522 @@ class ContactManager:
                 return False
             
             conn.commit()
+            if self._tag_index:
+                self._tag_index.remove_tag(contact_id, tag_name)
             print(f"Tag '{tag_name}' removed from contact")
             return True
             
         finally:
-            conn.close()
+            self.pool.release(conn)
+    
+    def get_tag_index(self) -> TagIndex:
+        """Get the in-memory tag index, building it on first use"""
+        with self._tag_index_lock:
+            if self._tag_index is None:
+                conn = self.pool.acquire()
+                try:
+                    self._tag_index = TagIndex.build(conn)
+                finally:
+                    self.pool.release(conn)
+            return self._tag_index
+    
+    def query_tags(self, expression: str, limit: int = None) -> List[Dict]:
+        """Get contacts matching a tag expression, in ID order
+        
+        Expressions combine tag names with AND, OR, NOT and parentheses,
+        e.g. 'vip AND (lead OR customer) AND NOT churned'.
+        """
+        try:
+            contact_ids = self.get_tag_index().query_ids(expression)
+        except ValueError as e:
+            print(f"Invalid tag query: {e}")
+            return []
+        
+        if limit is not None:
+            contact_ids = contact_ids[:limit]
+        
+        contacts = []
+        conn = self.pool.acquire()
+        try:
+            for i in range(0, len(contact_ids), IN_CHUNK_SIZE):
+                chunk = contact_ids[i:i + IN_CHUNK_SIZE]
+                contacts.extend(self._row_to_contact(row) for row in conn.execute(
+                    f"SELECT {CONTACT_COLUMNS} FROM contacts c "
+                    f"WHERE c.id IN ({', '.join('?' * len(chunk))}) ORDER BY c.id", chunk))
+        finally:
+            self.pool.release(conn)
+        return contacts
+    
+    def count_tags(self, expression: str) -> Optional[int]:
+        """Count contacts matching a tag expression, None if it is invalid"""
+        try:
+            return self.get_tag_index().count(expression)
+        except ValueError as e:
+            print(f"Invalid tag query: {e}")
+            return None
+    
+    def select_contact_ids(self, search_term: str = None, tag_query: str = None) -> List[int]:
+        """Get the IDs of contacts matching a search and/or a tag expression
+        
+        Use it to pick the contacts for the bulk_* methods, e.g.
+        ``manager.bulk_add_tag(manager.select_contact_ids(tag_query='lead'), 'q3')``.
+        """
+        if tag_query:
+            try:
+                contact_ids = self.get_tag_index().query_ids(tag_query)
+            except ValueError as e:
+                print(f"Invalid tag query: {e}")
+                return []
+            if not search_term:
+                return contact_ids
+        
+        if search_term:
+            matches = [contact['id'] for contact in self.search_contacts(search_term)]
+            if tag_query:
+                selected = set(contact_ids)
+                return sorted(contact_id for contact_id in matches if contact_id in selected)
+            return sorted(matches)
+        
+        conn = self.pool.acquire()
+        try:
+            return [row[0] for row in conn.execute('SELECT id FROM contacts ORDER BY id')]
+        finally:
+            self.pool.release(conn)
+    
+    def bulk_add_tag(self, contact_ids: List[int], tag_name: str) -> int:
+        """Add a tag to many contacts in one transaction
+        
+        Returns the number of contacts that got the tag; unknown IDs and
+        contacts that already have it are skipped.
+        """
+        contact_ids = list(dict.fromkeys(contact_ids))
+        if not contact_ids:
+            # Nothing to tag, so don't create the tag either
+            print("No contacts to tag")
+            return 0
+        
+        conn = self.pool.acquire()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT OR IGNORE INTO tags (name) VALUES (?)', (tag_name,))
+            tag_id = conn.execute('SELECT id FROM tags WHERE name = ?', (tag_name,)).fetchone()[0]
+            cursor = conn.executemany('''INSERT OR IGNORE INTO contact_tags (contact_id, tag_id)
+                                         SELECT id, ? FROM contacts WHERE id = ?''',
+                                      [(tag_id, contact_id) for contact_id in contact_ids])
+            count = cursor.rowcount
+            conn.commit()
+        finally:
+            self.pool.release(conn)
+        
+        if self._tag_index:
+            self._tag_index.add_tag_many(contact_ids, tag_name)
+        print(f"Tag '{tag_name}' added to {count} contacts")
+        return count
     
-    def export_contacts(self, filename: str = 'contacts_export.csv'):
-        """Export all contacts to CSV"""
-        contacts = self.search_contacts()
+    def bulk_remove_tag(self, contact_ids: List[int], tag_name: str) -> int:
+        """Remove a tag from many contacts in one transaction, returning how many had it"""
+        contact_ids = list(dict.fromkeys(contact_ids))
         
-        if not contacts:
-            print("No contacts to export")
+        conn = self.pool.acquire()
+        try:
+            tag_row = conn.execute('SELECT id FROM tags WHERE name = ?', (tag_name,)).fetchone()
+            if not tag_row:
+                print("Tag not found")
+                return 0
+            
+            cursor = conn.executemany('DELETE FROM contact_tags WHERE contact_id = ? AND tag_id = ?',
+                                      [(contact_id, tag_row[0]) for contact_id in contact_ids])
+            count = cursor.rowcount
+            conn.commit()
+        finally:
+            self.pool.release(conn)
+        
+        if self._tag_index:
+            self._tag_index.remove_tag_many(contact_ids, tag_name)
+        print(f"Tag '{tag_name}' removed from {count} contacts")
+        return count
+    
+    def bulk_update(self, contact_ids: List[int], **kwargs) -> int:
+        """Set the same field values on many contacts in one transaction
+        
+        Takes the fields update_contact does, except email, which must stay
+        unique. Returns the number of contacts updated.
+        """
+        if 'email' in kwargs:
+            print("Email cannot be bulk updated")
+            return 0
+        
+        fields = {field: value for field, value in kwargs.items() if field in CONTACT_FIELDS}
+        if not fields:
+            print("No valid fields to update")
+            return 0
+        
+        if fields.get('phone') and not self.validate_phone(fields['phone']):
+            print("Invalid phone format")
+            return 0
+        if ('first_name' in fields and not fields['first_name']) or \
+                ('last_name' in fields and not fields['last_name']):
+            print("First name and last name are required")
+            return 0
+        
+        values = list(fields.values()) + [datetime.now().isoformat()]
+        
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.executemany(f'''UPDATE contacts
+                                          SET {', '.join(f'{field} = ?' for field in fields)}, updated_at = ?
+                                          WHERE id = ?''',
+                                      [values + [contact_id] for contact_id in dict.fromkeys(contact_ids)])
+            count = cursor.rowcount
+            conn.commit()
+        finally:
+            self.pool.release(conn)
+        
+        print(f"{count} contacts updated")
+        return count
+    
+    def bulk_delete(self, contact_ids: List[int]) -> int:
+        """Delete many contacts and their tags in one transaction, returning how many were deleted"""
+        params = [(contact_id,) for contact_id in dict.fromkeys(contact_ids)]
+        
+        conn = self.pool.acquire()
+        try:
+            conn.executemany('DELETE FROM contact_tags WHERE contact_id = ?', params)
+            cursor = conn.executemany('DELETE FROM contacts WHERE id = ?', params)
+            count = cursor.rowcount
+            conn.commit()
+        finally:
+            self.pool.release(conn)
+        
+        if self._tag_index:
+            self._tag_index.remove_contacts(contact_id for contact_id, in params)
+        print(f"{count} contacts deleted")
+        return count
+    
+    def find_duplicates(self, threshold: float = 0.85, workers: int = None,
+                        batch_size: int = 5000) -> List[Tuple[int, int, float, Tuple[str, ...]]]:
+        """Find probable duplicate contacts
+        
+        Returns (id, other id, score, reasons) tuples, best matches first;
+        reasons name the shared fields ('phone', 'email', 'company'). See
+        dedupe.py for how contacts are blocked and scored.
+        """
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.execute('SELECT id, first_name, last_name, email, phone, company FROM contacts')
+            records = []
+            for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+                records.extend(to_record(*row) for row in rows)
+        finally:
+            self.pool.release(conn)
+        
+        return find_duplicate_pairs(records, threshold, workers)
+    
+    def merge_contacts(self, keep_id: int, duplicate_ids: List[int]) -> bool:
+        """Merge duplicates into one contact and delete them
+        
+        Empty fields of the kept contact are filled from the duplicates, in
+        the order given, and it receives all of their tags.
+        """
+        duplicate_ids = [contact_id for contact_id in dict.fromkeys(duplicate_ids) if contact_id != keep_id]
+        if not duplicate_ids:
+            print("No contacts to merge")
             return False
         
+        placeholders = ', '.join('?' * len(duplicate_ids))
+        
+        conn = self.pool.acquire()
         try:
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = ['id', 'first_name', 'last_name', 'email', 'phone', 
-                             'address', 'company', 'title', 'notes', 'tags']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for contact in contacts:
-                    writer.writerow(contact)
+            conn.execute('BEGIN IMMEDIATE')
+            rows = {row[0]: row[1:] for row in conn.execute(
+                f"SELECT id, {', '.join(CONTACT_FIELDS)} FROM contacts WHERE id IN (?, {placeholders})",
+                [keep_id] + duplicate_ids)}
+            if len(rows) != len(duplicate_ids) + 1:
+                print("Contact not found")
+                return False
             
-            print(f"Contacts exported to {filename}")
-            return True
+            merged = list(rows[keep_id])
+            for contact_id in duplicate_ids:
+                merged = [value if value else other for value, other in zip(merged, rows[contact_id])]
             
+            conn.execute(f'''INSERT OR IGNORE INTO contact_tags (contact_id, tag_id)
+                             SELECT ?, tag_id FROM contact_tags WHERE contact_id IN ({placeholders})''',
+                         [keep_id] + duplicate_ids)
+            conn.execute(f'DELETE FROM contact_tags WHERE contact_id IN ({placeholders})', duplicate_ids)
+            # Delete first: the kept contact may take over a duplicate's unique email
+            conn.execute(f'DELETE FROM contacts WHERE id IN ({placeholders})', duplicate_ids)
+            conn.execute(f'''UPDATE contacts SET {', '.join(f'{field} = ?' for field in CONTACT_FIELDS)},
+                                                updated_at = ?
+                             WHERE id = ?''', merged + [datetime.now().isoformat(), keep_id])
+            conn.commit()
+        finally:
+            self.pool.release(conn)
+        
+        # Rebuilt on the next tag query
+        self._tag_index = None
+        print(f"Merged {len(duplicate_ids)} contacts into contact {keep_id}")
+        return True
+    
+    def export_contacts(self, filename: str = 'contacts_export.csv', columns: List[str] = None,
+                        format: str = None, compress: bool = None, batch_size: int = 5000) -> bool:
+        """Export all contacts to CSV, JSON lines or Parquet
+        
+        Rows are streamed from the database in batches of batch_size, so
+        memory use does not grow with the number of contacts. ``columns``
+        selects and orders the exported fields (see EXPORT_COLUMNS). The
+        format is taken from the file extension unless given: '.jsonl' for
+        JSON lines, '.parquet' for Parquet (requires pyarrow), CSV otherwise.
+        CSV and JSON lines are gzip-compressed when compress is set or the
+        name ends in '.gz'. Returns False, without creating the file, when
+        there are no contacts.
+        """
+        columns = columns or DEFAULT_EXPORT_COLUMNS
+        unknown = [column for column in columns if column not in EXPORT_COLUMNS]
+        if unknown:
+            print(f"Unknown columns: {', '.join(unknown)}")
+            return False
+        
+        name = filename[:-3] if filename.endswith('.gz') else filename
+        if format is None:
+            format = 'jsonl' if name.endswith('.jsonl') else 'parquet' if name.endswith('.parquet') else 'csv'
+        if compress is None:
+            compress = filename.endswith('.gz')
+        
+        writers = {'csv': self._write_csv, 'jsonl': self._write_jsonl, 'parquet': self._write_parquet}
+        if format not in writers:
+            print(f"Unsupported export format: {format}")
+            return False
+        
+        query = (f"SELECT {', '.join(EXPORT_COLUMNS[column] for column in columns)} "
+                 f"FROM contacts c ORDER BY c.last_name, c.first_name")
+        
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.execute(query)
+            first = cursor.fetchmany(batch_size)
+            if not first:
+                # Nothing to write: leave any existing file alone
+                print("No contacts to export")
+                return False
+            batches = itertools.chain([first], iter(lambda: cursor.fetchmany(batch_size), []))
+            count = writers[format](filename, columns, batches, compress)
+        except ImportError:
+            print("Parquet export requires pyarrow (pip install pyarrow)")
+            return False
         except Exception as e:
             print(f"Error exporting contacts: {e}")
             return False
+        finally:
+            self.pool.release(conn)
+        
+        print(f"{count} contacts exported to {filename}")
+        return True
+    
+    @staticmethod
+    def _open_text(filename: str, compress: bool):
+        if compress:
+            return gzip.open(filename, 'wt', compresslevel=6, newline='', encoding='utf-8')
+        return open(filename, 'w', newline='', encoding='utf-8')
+    
+    def _write_csv(self, filename: str, columns: List[str], batches, compress: bool) -> int:
+        count = 0
+        with self._open_text(filename, compress) as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(columns)
+            for rows in batches:
+                writer.writerows(rows)
+                count += len(rows)
+        return count
+    
+    def _write_jsonl(self, filename: str, columns: List[str], batches, compress: bool) -> int:
+        count = 0
+        with self._open_text(filename, compress) as jsonfile:
+            for rows in batches:
+                jsonfile.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+                                    for row in rows)
+                count += len(rows)
+        return count
+    
+    @staticmethod
+    def _write_parquet(filename: str, columns: List[str], batches, compress: bool) -> int:
+        """Write one Parquet row group per batch (Parquet compresses on its own)"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        schema = pa.schema([(column, pa.int64() if column == 'id' else pa.string()) for column in columns])
+        count = 0
+        with pq.ParquetWriter(filename, schema, compression='zstd') as writer:
+            for rows in batches:
+                writer.write_table(pa.Table.from_arrays(
+                    [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)],
+                    schema=schema))
+                count += len(rows)
+        return count
+    
+    def import_contacts(self, filename: str, upsert: bool = False, batch_size: int = 5000) -> bool:
+        """Import contacts from CSV
+        
+        With upsert, rows whose email already exists update that contact
+        instead of being rejected.
+        """
+        try:
+            report = self.bulk_import_contacts(filename, upsert, batch_size)
+        except FileNotFoundError:
+            print("File not found")
+            return False
+        except (OSError, csv.Error, UnicodeDecodeError) as e:
+            print(f"Error importing contacts: {e}")
+            return False
+        
+        summary = f"Imported {report['imported']} contacts"
+        if upsert:
+            summary += f", updated {report['updated']}"
+        print(summary)
+        
+        errors = report['errors']
+        if errors:
+            print(f"{len(errors)} rows skipped:")
+            for line, message in errors[:20]:
+                print(f"  line {line}: {message}")
+            if len(errors) > 20:
+                print(f"  ... and {len(errors) - 20} more")
+        
+        return True
     
-    def import_contacts(self, filename: str):
-        """Import contacts from CSV"""
+    def bulk_import_contacts(self, filename: str, upsert: bool = False,
+                             batch_size: int = 5000) -> Dict:
+        """Stream a CSV file into the database in batched transactions
+        
+        Each batch of rows is validated, then written with executemany in one
+        transaction; tag names are resolved through an in-memory map. Invalid
+        rows are reported and skipped. Returns a dict with ``imported`` and
+        ``updated`` counts and ``errors``, a list of (line number, message).
+        """
+        report = {'imported': 0, 'updated': 0, 'errors': []}
+        
+        conn = self.pool.acquire()
         try:
-            with open(filename, 'r', encoding='utf-8') as csvfile:
+            # Tag vocabularies are small; resolve every existing name up front
+            tag_ids = dict(conn.execute('SELECT name, id FROM tags'))
+            
+            with open(filename, 'r', newline='', encoding='utf-8') as csvfile:
                 reader = csv.DictReader(csvfile)
-                imported_count = 0
+                batch = []
                 
                 for row in reader:
-                    # Skip rows without required fields
-                    if not row.get('first_name') or not row.get('last_name'):
-                        continue
-                    
-                    contact_id = self.add_contact(
-                        first_name=row.get('first_name', ''),
-                        last_name=row.get('last_name', ''),
-                        email=row.get('email'),
-                        phone=row.get('phone'),
-                        address=row.get('address'),
-                        company=row.get('company'),
-                        title=row.get('title'),
-                        notes=row.get('notes')
-                    )
-                    
-                    if contact_id:
-                        imported_count += 1
-                        # Add tags if specified
-                        tags = row.get('tags', '').split(',')
-                        for tag in tags:
-                            tag = tag.strip()
-                            if tag:
-                                self.add_tag(contact_id, tag)
+                    batch.append((reader.line_num, row))
+                    if len(batch) >= batch_size:
+                        self._import_batch(conn, batch, tag_ids, upsert, report)
+                        batch = []
                 
-                print(f"Imported {imported_count} contacts")
-                return True
+                if batch:
+                    self._import_batch(conn, batch, tag_ids, upsert, report)
+        finally:
+            self.pool.release(conn)
+            # Rebuilt on the next tag query
+            self._tag_index = None
+        
+        report['errors'].sort()
+        return report
+    
+    def _import_batch(self, conn: sqlite3.Connection, batch: List[Tuple[int, Dict]],
+                      tag_ids: Dict[str, int], upsert: bool, report: Dict):
+        """Validate and write one batch of CSV rows in a single transaction"""
+        rows = []
+        for line, row in batch:
+            fields = {field: (row.get(field) or '').strip() or None for field in CONTACT_FIELDS}
+            error = self._validate_fields(fields)
+            if error:
+                report['errors'].append((line, error))
+                continue
+            tags = [tag.strip() for tag in (row.get('tags') or '').split(',') if tag.strip()]
+            rows.append((line, fields, tags))
+        
+        if not rows:
+            return
+        
+        errors = []
+        inserts = []
+        updates = []
+        links = []
+        now = datetime.now().isoformat()
+        
+        # IMMEDIATE takes the write lock now, so the IDs assigned below stay free
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            emails = [fields['email'] for _, fields, _ in rows if fields['email']]
+            existing = {}
+            for i in range(0, len(emails), IN_CHUNK_SIZE):
+                chunk = emails[i:i + IN_CHUNK_SIZE]
+                existing.update(conn.execute(
+                    f"SELECT email, id FROM contacts WHERE email IN ({', '.join('?' * len(chunk))})", chunk))
+            
+            # Assign IDs ourselves so tags can be linked without a lookup per row
+            next_id = conn.execute('''SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence
+                                                        WHERE name = 'contacts'), 0),
+                                             COALESCE((SELECT MAX(id) FROM contacts), 0))''').fetchone()[0] + 1
+            
+            for line, fields, tags in rows:
+                values = [fields[field] for field in CONTACT_FIELDS]
+                email = fields['email']
                 
-        except FileNotFoundError:
-            print("File not found")
-            return False
-        except Exception as e:
-            print(f"Error importing contacts: {e}")
-            return False
+                if email in existing:
+                    if not upsert:
+                        errors.append((line, "Email already exists in database"))
+                        continue
+                    contact_id = existing[email]
+                    updates.append(values + [now, contact_id])
+                else:
+                    contact_id = next_id
+                    next_id += 1
+                    inserts.append([contact_id] + values)
+                    if email:
+                        existing[email] = contact_id
+                
+                links.extend((contact_id, tag) for tag in tags)
+            
+            conn.executemany(f'''INSERT INTO contacts (id, {', '.join(CONTACT_FIELDS)})
+                                 VALUES (?, {', '.join('?' * len(CONTACT_FIELDS))})''', inserts)
+            # Blank CSV cells keep the stored value; names are always present
+            conn.executemany('''UPDATE contacts
+                                SET first_name = ?, last_name = ?, email = COALESCE(?, email),
+                                    phone = COALESCE(?, phone), address = COALESCE(?, address),
+                                    company = COALESCE(?, company), title = COALESCE(?, title),
+                                    notes = COALESCE(?, notes), updated_at = ?
+                                WHERE id = ?''', updates)
+            
+            new_tags = sorted({tag for _, tag in links if tag not in tag_ids})
+            new_tag_ids = {}
+            if new_tags:
+                conn.executemany('INSERT OR IGNORE INTO tags (name) VALUES (?)', [(tag,) for tag in new_tags])
+                for i in range(0, len(new_tags), IN_CHUNK_SIZE):
+                    chunk = new_tags[i:i + IN_CHUNK_SIZE]
+                    new_tag_ids.update(conn.execute(
+                        f"SELECT name, id FROM tags WHERE name IN ({', '.join('?' * len(chunk))})", chunk))
+            
+            conn.executemany('INSERT OR IGNORE INTO contact_tags (contact_id, tag_id) VALUES (?, ?)',
+                             [(contact_id, tag_ids.get(tag) or new_tag_ids[tag]) for contact_id, tag in links])
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            report['errors'].extend((line, f"Batch not imported: {e}") for line, _, _ in rows)
+            return
+        
+        # Only remember new tag IDs once they are committed
+        tag_ids.update(new_tag_ids)
+        report['imported'] += len(inserts)
+        report['updated'] += len(updates)
+        report['errors'].extend(errors)
+    
+    def _validate_fields(self, fields: Dict) -> Optional[str]:
+        """Return why a contact's fields are invalid, or None if they are valid"""
+        if not fields.get('first_name') or not fields.get('last_name'):
+            return "First name and last name are required"
+        if fields.get('email') and not self.validate_email(fields['email']):
+            return "Invalid email format"
+        if fields.get('phone') and not self.validate_phone(fields['phone']):
+            return "Invalid phone format"
+        return None
 
 def display_contact(contact: Dict):
     """Display a contact in a formatted way"""
@@ -422,9 +1127,12 @@ def main():
         print("7. Remove Tag from Contact")
         print("8. Export Contacts")
         print("9. Import Contacts")
-        print("10. Exit")
+        print("10. Find Duplicates")
+        print("11. Merge Contacts")
+        print("12. Query by Tags")
+        print("13. Exit")
         
-        choice = input("\nEnter your choice (1-10): ").strip()
+        choice = input("\nEnter your choice (1-13): ").strip()
         
         if choice == "1":
             print("\nAdd New Contact")
@@ -540,16 +1248,61 @@ def main():
                 manager.remove_tag(int(contact_id), tag_name)
         
         elif choice == "8":
-            filename = input("Export filename (default: contacts_export.csv): ").strip()
+            filename = input("Export filename, .csv/.jsonl/.parquet, add .gz to compress "
+                             "(default: contacts_export.csv): ").strip()
             filename = filename or 'contacts_export.csv'
             manager.export_contacts(filename)
         
         elif choice == "9":
             filename = input("Import filename: ").strip()
             if filename:
-                manager.import_contacts(filename)
+                upsert = input("Update contacts with matching emails? (y/n): ").strip().lower() == 'y'
+                manager.import_contacts(filename, upsert=upsert)
         
         elif choice == "10":
+            pairs = manager.find_duplicates()
+            if not pairs:
+                print("No duplicates found")
+                continue
+            
+            groups = group_pairs(pairs)
+            print(f"\nFound {len(groups)} groups of probable duplicates:")
+            for group in groups[:20]:
+                print(', '.join(str(contact_id) for contact_id in group))
+            if len(groups) > 20:
+                print(f"... and {len(groups) - 20} more")
+        
+        elif choice == "11":
+            keep_id = input("Contact ID to keep: ").strip()
+            duplicate_ids = [contact_id.strip() for contact_id in
+                             input("Contact IDs to merge into it (comma-separated): ").split(',')
+                             if contact_id.strip()]
+            if not keep_id.isdigit() or not all(contact_id.isdigit() for contact_id in duplicate_ids):
+                print("Invalid contact ID")
+                continue
+            
+            manager.merge_contacts(int(keep_id), [int(contact_id) for contact_id in duplicate_ids])
+        
+        elif choice == "12":
+            expression = input("Tag query, e.g. vip AND (lead OR customer) AND NOT churned: ").strip()
+            if not expression:
+                continue
+            
+            total = manager.count_tags(expression)
+            if total is None:
+                continue
+            if total == 0:
+                print("No contacts found")
+                continue
+            
+            print(f"\nFound {total} contacts:")
+            for contact in manager.query_tags(expression, limit=50):
+                print(f"{contact['id']}: {contact['first_name']} {contact['last_name']} "
+                      f"({contact['email'] or 'No email'}) - Tags: {contact['tags']}")
+            if total > 50:
+                print(f"... and {total - 50} more")
+        
+        elif choice == "13":
             print("Goodbye!")
             break
         
@@ -0,0 +1,185 @@
+"""In-memory tag index for ContactManager.
+
+Each tag maps to a bitset, a Python int whose bit n is set when contact n
+has the tag. Tag queries combine the bitsets with &, | and ~, which touches
+a few bytes per contact instead of joining contact_tags once per tag:
+
+    vip AND (lead OR customer) AND NOT churned
+
+Operators are upper case; NOT binds tighter than AND, which binds tighter
+than OR. Tag names containing spaces or parentheses can be double-quoted.
+The index is built from contact_tags on first use and kept current by the
+ContactManager methods that change tags. Changes made by other processes
+are not seen until the index is rebuilt.
+"""
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List
+
+TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|"((?:[^"]|"")*)"|([^\s()"]+))')
+
+# Bit positions set in each byte value, for turning bitsets back into IDs
+BYTE_BITS = [[bit for bit in range(8) if value >> bit & 1] for value in range(256)]
+
+
+def to_bitset(contact_ids: Iterable[int]) -> int:
+    contact_ids = list(contact_ids)
+    if not contact_ids:
+        return 0
+    bits = bytearray(max(contact_ids) // 8 + 1)
+    for contact_id in contact_ids:
+        bits[contact_id >> 3] |= 1 << (contact_id & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def from_bitset(bits: int) -> List[int]:
+    """List the set bit positions in ascending order"""
+    contact_ids = []
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for offset, value in enumerate(data):
+        if value:
+            base = offset * 8
+            contact_ids.extend(base + bit for bit in BYTE_BITS[value])
+    return contact_ids
+
+
+class TagIndex:
+    """Bitsets of contact IDs per tag name, plus one of all contacts"""
+
+    def __init__(self):
+        self.tags: Dict[str, int] = {}
+        self.contacts = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, conn: sqlite3.Connection) -> 'TagIndex':
+        """Load every contact and tag assignment from the database"""
+        index = cls()
+        index.contacts = to_bitset(row[0] for row in conn.execute('SELECT id FROM contacts'))
+
+        members: Dict[str, List[int]] = {}
+        for name, contact_id in conn.execute('''SELECT t.name, ct.contact_id
+                                                FROM contact_tags ct JOIN tags t ON ct.tag_id = t.id'''):
+            members.setdefault(name, []).append(contact_id)
+        # contact_tags rows of deleted or unknown contacts must not match
+        index.tags = {name: to_bitset(contact_ids) & index.contacts for name, contact_ids in members.items()}
+        return index
+
+    def add_contact(self, contact_id: int):
+        with self._lock:
+            self.contacts |= 1 << contact_id
+
+    def remove_contact(self, contact_id: int):
+        mask = ~(1 << contact_id)
+        with self._lock:
+            self.contacts &= mask
+            for name, bits in self.tags.items():
+                if bits >> contact_id & 1:
+                    self.tags[name] = bits & mask
+
+    def add_tag(self, contact_id: int, tag_name: str):
+        """Tag one contact; an unknown contact ID is ignored, as in add_tag_many"""
+        with self._lock:
+            self.tags[tag_name] = self.tags.get(tag_name, 0) | (1 << contact_id) & self.contacts
+
+    def remove_tag(self, contact_id: int, tag_name: str):
+        with self._lock:
+            if tag_name in self.tags:
+                self.tags[tag_name] &= ~(1 << contact_id)
+
+    def remove_contacts(self, contact_ids: Iterable[int]):
+        mask = ~to_bitset(contact_ids)
+        with self._lock:
+            self.contacts &= mask
+            self.tags = {name: bits & mask for name, bits in self.tags.items()}
+
+    def add_tag_many(self, contact_ids: Iterable[int], tag_name: str):
+        """Tag many contacts at once; IDs of unknown contacts are ignored"""
+        bits = to_bitset(contact_ids)
+        with self._lock:
+            self.tags[tag_name] = self.tags.get(tag_name, 0) | bits & self.contacts
+
+    def remove_tag_many(self, contact_ids: Iterable[int], tag_name: str):
+        mask = ~to_bitset(contact_ids)
+        with self._lock:
+            if tag_name in self.tags:
+                self.tags[tag_name] &= mask
+
+    def query(self, expression: str) -> int:
+        """Evaluate a tag expression to the bitset of matching contacts
+
+        Raises ValueError if the expression is malformed. Unknown tags match
+        no contacts.
+        """
+        tokens = self._tokenize(expression)
+        if not tokens:
+            raise ValueError("Empty tag query")
+        with self._lock:
+            bits, position = self._parse_or(tokens, 0)
+        if position != len(tokens):
+            raise ValueError(f"Unexpected '{tokens[position][1]}'")
+        return bits
+
+    def query_ids(self, expression: str) -> List[int]:
+        return from_bitset(self.query(expression))
+
+    def count(self, expression: str) -> int:
+        return bin(self.query(expression)).count('1')
+
+    @staticmethod
+    def _tokenize(expression: str) -> List[tuple]:
+        """Split an expression into (kind, text) tokens"""
+        tokens = []
+        position = 0
+        expression = expression.rstrip()
+        while position < len(expression):
+            match = TOKEN_PATTERN.match(expression, position)
+            if not match:
+                raise ValueError("Unterminated quote in tag query")
+            position = match.end()
+            opening, closing, quoted, word = match.groups()
+            if opening:
+                tokens.append(('(', opening))
+            elif closing:
+                tokens.append((')', closing))
+            elif quoted is not None:
+                tokens.append(('tag', quoted.replace('""', '"')))
+            elif word in ('AND', 'OR', 'NOT'):
+                tokens.append((word, word))
+            else:
+                tokens.append(('tag', word))
+        return tokens
+
+    def _parse_or(self, tokens: List[tuple], position: int):
+        bits, position = self._parse_and(tokens, position)
+        while position < len(tokens) and tokens[position][0] == 'OR':
+            other, position = self._parse_and(tokens, position + 1)
+            bits |= other
+        return bits, position
+
+    def _parse_and(self, tokens: List[tuple], position: int):
+        bits, position = self._parse_not(tokens, position)
+        while position < len(tokens) and tokens[position][0] == 'AND':
+            other, position = self._parse_not(tokens, position + 1)
+            bits &= other
+        return bits, position
+
+    def _parse_not(self, tokens: List[tuple], position: int):
+        if position < len(tokens) and tokens[position][0] == 'NOT':
+            bits, position = self._parse_not(tokens, position + 1)
+            return self.contacts & ~bits, position
+        return self._parse_term(tokens, position)
+
+    def _parse_term(self, tokens: List[tuple], position: int):
+        if position >= len(tokens):
+            raise ValueError("Tag query ends unexpectedly")
+        kind, text = tokens[position]
+        if kind == 'tag':
+            return self.tags.get(text, 0), position + 1
+        if kind == '(':
+            bits, position = self._parse_or(tokens, position + 1)
+            if position >= len(tokens) or tokens[position][0] != ')':
+                raise ValueError("Missing ')' in tag query")
+            return bits, position + 1
+        raise ValueError(f"Unexpected '{text}'")
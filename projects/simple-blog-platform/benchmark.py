@@ -0,0 +1,97 @@
+"""Pagination benchmark for SimpleBlogPlatform.
+
+Fills a scratch database with synthetic posts and compares the time to fetch
+a page at increasing depths using OFFSET paging and keyset (cursor) paging.
+
+    python benchmark.py --posts 1000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from main import SimpleBlogPlatform
+
+
+def populate(db_name: str, post_count: int, category_count: int = 50, batch_size: int = 50000):
+    """Insert synthetic posts, categories and comments directly with executemany"""
+    conn = sqlite3.connect(db_name)
+    c = conn.cursor()
+
+    c.executemany('INSERT INTO categories (name) VALUES (?)',
+                  [(f'category-{i}',) for i in range(category_count)])
+
+    start = datetime(2015, 1, 1)
+    rng = random.Random(42)
+
+    for first in range(0, post_count, batch_size):
+        ids = range(first + 1, min(first + batch_size, post_count) + 1)
+        c.executemany('''INSERT INTO posts (id, title, content, author, created_at, updated_at, published, slug)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                      [(i, f'Post {i}', 'Lorem ipsum dolor sit amet. ' * 10, f'author-{i % 100}',
+                        (start + timedelta(seconds=i * 60)).strftime('%Y-%m-%d %H:%M:%S'),
+                        (start + timedelta(seconds=i * 60)).strftime('%Y-%m-%d %H:%M:%S'),
+                        i % 10 != 0, f'post-{i}')
+                       for i in ids])
+        c.executemany('INSERT INTO post_categories (post_id, category_id) VALUES (?, ?)',
+                      [(i, rng.randint(1, category_count)) for i in ids])
+        c.executemany('INSERT INTO comments (post_id, author, content, approved) VALUES (?, ?, ?, ?)',
+                      [(i, 'reader', 'Nice post', True) for i in ids if i % 3 == 0])
+        conn.commit()
+
+    conn.close()
+
+
+def time_call(func, repeat: int = 5) -> float:
+    """Return the best wall-clock time of ``repeat`` calls in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark OFFSET vs keyset pagination')
+    parser.add_argument('--posts', type=int, default=1000000, help='number of posts to generate')
+    parser.add_argument('--page-size', type=int, default=20, help='posts per page')
+    parser.add_argument('--db', default='benchmark_blog.db', help='scratch database file')
+    parser.add_argument('--keep', action='store_true', help='keep an existing scratch database')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db) and not args.keep:
+        os.remove(args.db)
+
+    fresh = not os.path.exists(args.db)
+    blog = SimpleBlogPlatform(args.db)
+
+    if fresh:
+        print(f"Generating {args.posts} posts...")
+        started = time.perf_counter()
+        populate(args.db, args.posts)
+        print(f"Generated in {time.perf_counter() - started:.1f}s")
+
+    print(f"\n{'depth':>10} {'offset (ms)':>12} {'keyset (ms)':>12}")
+
+    depth = args.page_size
+    while depth < args.posts * 0.9:
+        # Cursor of the post just before the requested page
+        conn = sqlite3.connect(args.db)
+        cursor = conn.execute('''SELECT created_at, id FROM posts WHERE published = TRUE
+                                 ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?''',
+                              (depth - 1,)).fetchone()
+        conn.close()
+        if not cursor:
+            break
+
+        offset_ms = time_call(lambda: blog.get_posts(True, None, args.page_size, depth))
+        keyset_ms = time_call(lambda: blog.get_posts_page(True, None, args.page_size, tuple(cursor)))
+        print(f"{depth:>10} {offset_ms:>12.2f} {keyset_ms:>12.2f}")
+        depth *= 10
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Read-through query cache for SimpleBlogPlatform.
+
+Entries are stored under a key built from the query parameters and labelled
+with tags such as ``post:12`` or ``posts``. Writes invalidate the tags they
+touch, so only the affected entries are dropped.
+
+Two backends share the same interface:
+
+- ``MemoryCache``: per-process, TTL plus LRU eviction.
+- ``SQLiteCache``: a cache database file shared by several worker processes.
+  Put the file on a tmpfs such as /dev/shm to keep it in shared memory.
+
+Cached values are shared between callers and must be treated as read-only.
+"""
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable
+
+# Returned by get() when a key is missing or expired; None is a valid value
+MISS = object()
+
+
+class MemoryCache:
+    """In-process cache with TTL expiry and LRU eviction"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value for key, or MISS"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS
+
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return MISS
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()):
+        """Store a value labelled with tags"""
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, *tags: str):
+        """Drop every entry labelled with any of the tags"""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key: Hashable):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Cache stored in an SQLite file so several processes can share it
+
+    A hit records its access time only when the stored one is more than
+    touch_interval seconds old, so most hits stay read-only and don't take
+    the write lock. LRU eviction is therefore accurate to touch_interval.
+    """
+
+    def __init__(self, path: str = 'blog_cache.db', max_entries: int = 10000, ttl: float = 300,
+                 touch_interval: float = 10):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+        conn = self._connection()
+        with conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS entries
+                            (key TEXT PRIMARY KEY,
+                             value BLOB NOT NULL,
+                             expires REAL NOT NULL,
+                             last_access REAL NOT NULL)''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS entry_tags
+                            (tag TEXT NOT NULL,
+                             key TEXT NOT NULL,
+                             PRIMARY KEY (tag, key))''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_entry_tags_key ON entry_tags (key)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_access ON entries (last_access)')
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value for key, or MISS"""
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute('SELECT value, expires, last_access FROM entries WHERE key = ?',
+                           (repr(key),)).fetchone()
+
+        if row is None or row[1] < now:
+            self.misses += 1
+            return MISS
+
+        if now - row[2] > self.touch_interval:
+            with conn:
+                # The condition makes concurrent touches of the same entry no-ops
+                conn.execute('UPDATE entries SET last_access = ? WHERE key = ? AND last_access < ?',
+                             (now, repr(key), now - self.touch_interval))
+        self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str] = ()):
+        """Store a value labelled with tags"""
+        conn = self._connection()
+        now = time.time()
+        key = repr(key)
+
+        with conn:
+            conn.execute('DELETE FROM entry_tags WHERE key = ?', (key,))
+            conn.execute('INSERT OR REPLACE INTO entries (key, value, expires, last_access) VALUES (?, ?, ?, ?)',
+                         (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + self.ttl, now))
+            conn.executemany('INSERT OR IGNORE INTO entry_tags (tag, key) VALUES (?, ?)',
+                             [(tag, key) for tag in tags])
+
+            overflow = conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0] - self.max_entries
+            if overflow > 0:
+                self._delete_where(conn, '''key IN (SELECT key FROM entries
+                                                    ORDER BY last_access LIMIT ?)''', (overflow,))
+
+    def invalidate(self, *tags: str):
+        """Drop every entry labelled with any of the tags"""
+        if not tags:
+            return
+
+        conn = self._connection()
+        placeholders = ', '.join('?' * len(tags))
+        with conn:
+            self._delete_where(conn, f'key IN (SELECT key FROM entry_tags WHERE tag IN ({placeholders}))', tags)
+
+    def clear(self):
+        """Drop all entries"""
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM entries')
+            conn.execute('DELETE FROM entry_tags')
+
+    @staticmethod
+    def _delete_where(conn: sqlite3.Connection, condition: str, params):
+        keys = [row[0] for row in conn.execute(f'SELECT key FROM entries WHERE {condition}', params)]
+        conn.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key in keys])
+        conn.executemany('DELETE FROM entry_tags WHERE key = ?', [(key,) for key in keys])
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
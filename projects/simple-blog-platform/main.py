@@ -1,15 +1,120 @@
 import sqlite3
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import markdown
 import os
-from typing import List, Dict, Optional
+import re
+from typing import List, Dict, Optional, Tuple, Any, Hashable, Iterable
+
+from cache import MISS
+
+# Recompute the denormalized counters from the source tables. Each statement
+# only touches rows whose stored count has drifted.
+REPAIR_COUNTERS = [
+    '''UPDATE categories
+       SET post_count = (SELECT COUNT(*) FROM post_categories WHERE category_id = categories.id)
+       WHERE post_count != (SELECT COUNT(*) FROM post_categories WHERE category_id = categories.id)''',
+    '''UPDATE posts
+       SET comment_count = (SELECT COUNT(*) FROM comments WHERE post_id = posts.id),
+           approved_comment_count = (SELECT COUNT(*) FROM comments WHERE post_id = posts.id AND approved)
+       WHERE comment_count != (SELECT COUNT(*) FROM comments WHERE post_id = posts.id)
+          OR approved_comment_count != (SELECT COUNT(*) FROM comments
+                                        WHERE post_id = posts.id AND approved)''',
+]
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# Each entry is a list of statements; never edit an entry once released,
+# append a new one instead.
+MIGRATIONS = [
+    # 1: indexes backing keyset pagination, category filters and comment lookups
+    ['CREATE INDEX IF NOT EXISTS idx_posts_created ON posts (created_at DESC, id DESC)',
+     'CREATE INDEX IF NOT EXISTS idx_posts_published_created '
+     'ON posts (published, created_at DESC, id DESC)',
+     'CREATE INDEX IF NOT EXISTS idx_post_categories_category ON post_categories (category_id, post_id)',
+     'CREATE INDEX IF NOT EXISTS idx_comments_post ON comments (post_id, created_at)'],
+    # 2: denormalized counters kept in step by triggers
+    ['ALTER TABLE categories ADD COLUMN post_count INTEGER NOT NULL DEFAULT 0',
+     'ALTER TABLE posts ADD COLUMN comment_count INTEGER NOT NULL DEFAULT 0',
+     'ALTER TABLE posts ADD COLUMN approved_comment_count INTEGER NOT NULL DEFAULT 0',
+     '''CREATE TRIGGER IF NOT EXISTS trg_post_categories_insert AFTER INSERT ON post_categories
+        BEGIN
+            UPDATE categories SET post_count = post_count + 1 WHERE id = NEW.category_id;
+        END''',
+     '''CREATE TRIGGER IF NOT EXISTS trg_post_categories_delete AFTER DELETE ON post_categories
+        BEGIN
+            UPDATE categories SET post_count = post_count - 1 WHERE id = OLD.category_id;
+        END''',
+     '''CREATE TRIGGER IF NOT EXISTS trg_comments_insert AFTER INSERT ON comments
+        BEGIN
+            UPDATE posts
+            SET comment_count = comment_count + 1,
+                approved_comment_count = approved_comment_count + (CASE WHEN NEW.approved THEN 1 ELSE 0 END)
+            WHERE id = NEW.post_id;
+        END''',
+     '''CREATE TRIGGER IF NOT EXISTS trg_comments_delete AFTER DELETE ON comments
+        BEGIN
+            UPDATE posts
+            SET comment_count = comment_count - 1,
+                approved_comment_count = approved_comment_count - (CASE WHEN OLD.approved THEN 1 ELSE 0 END)
+            WHERE id = OLD.post_id;
+        END''',
+     '''CREATE TRIGGER IF NOT EXISTS trg_comments_update AFTER UPDATE OF post_id, approved ON comments
+        BEGIN
+            UPDATE posts
+            SET comment_count = comment_count - 1,
+                approved_comment_count = approved_comment_count - (CASE WHEN OLD.approved THEN 1 ELSE 0 END)
+            WHERE id = OLD.post_id;
+            UPDATE posts
+            SET comment_count = comment_count + 1,
+                approved_comment_count = approved_comment_count + (CASE WHEN NEW.approved THEN 1 ELSE 0 END)
+            WHERE id = NEW.post_id;
+        END'''] + REPAIR_COUNTERS,
+    # 3: moderation queue of pending comments, oldest first
+    ['CREATE INDEX IF NOT EXISTS idx_comments_approved_created ON comments (approved, created_at, id)'],
+]
+
+# Largest number of IDs bound into a single IN (...) list; older SQLite
+# builds cap a statement at 999 parameters.
+ID_CHUNK_SIZE = 500
+
+# Columns selected for a post; categories are aggregated per row so the
+# outer query never has to GROUP BY the whole posts table.
+POST_COLUMNS = '''p.id, p.title, p.content, p.author, p.created_at, p.updated_at, p.published, p.slug,
+                  p.comment_count, p.approved_comment_count,
+                  (SELECT GROUP_CONCAT(c.name, ', ')
+                   FROM post_categories pc
+                   JOIN categories c ON pc.category_id = c.id
+                   WHERE pc.post_id = p.id) AS categories'''
 
 class SimpleBlogPlatform:
-    def __init__(self, db_name='blog.db'):
+    def __init__(self, db_name='blog.db', cache=None):
+        """Create the platform; pass a MemoryCache or SQLiteCache to cache reads"""
         self.db_name = db_name
+        self.cache = cache
         self.init_db()
     
+    def _cache_get(self, key: Hashable) -> Any:
+        """Look up a cached query result, returning MISS when caching is off"""
+        if self.cache is None:
+            return MISS
+        return self.cache.get(key)
+    
+    def _cache_set(self, key: Hashable, value: Any, *tags: str):
+        """Cache a query result labelled with the tags that invalidate it"""
+        if self.cache is not None:
+            self.cache.set(key, value, tags)
+    
+    def _invalidate(self, *tags: str):
+        """Drop cached results affected by a write
+        
+        Tags: ``post:<id>`` for get_post, ``posts`` for get_posts listings,
+        ``categories`` for get_categories and ``comments:<post_id>`` for
+        get_comments. Comment writes also drop ``post:<id>`` and ``posts``
+        because posts carry comment counters.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(*tags)
+    
     def init_db(self):
         """Initialize the database"""
         conn = sqlite3.connect(self.db_name)
@@ -51,11 +156,35 @@ class SimpleBlogPlatform:
                       FOREIGN KEY (post_id) REFERENCES posts (id))''')
         
         conn.commit()
+        self.migrate_db(conn)
         conn.close()
     
+    def migrate_db(self, conn: sqlite3.Connection):
+        """Apply pending schema migrations
+        
+        Each migration runs in an explicit transaction with its user_version
+        bump. sqlite3 would otherwise run DDL such as ALTER TABLE outside
+        any transaction, so a migration interrupted partway left changes
+        that the next startup tried to apply again. BEGIN IMMEDIATE also
+        keeps processes starting together from applying one twice.
+        """
+        while conn.execute('PRAGMA user_version').fetchone()[0] < len(MIGRATIONS):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Another process may have migrated since the check above
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+                if version < len(MIGRATIONS):
+                    for statement in MIGRATIONS[version]:
+                        conn.execute(statement)
+                    # PRAGMA does not accept bound parameters
+                    conn.execute(f'PRAGMA user_version = {version + 1}')
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+    
     def generate_slug(self, title: str) -> str:
         """Generate a URL-friendly slug from title"""
-        import re
         slug = title.lower()
         slug = re.sub(r'[^a-z0-9]+', '-', slug)
         slug = re.sub(r'^-+|-+$', '', slug)
@@ -84,12 +213,13 @@ class SimpleBlogPlatform:
             # Add categories if provided
             if categories:
                 for category_name in categories:
-                    category_id = self.get_or_create_category(category_name)
+                    category_id = self.get_or_create_category(category_name, c)
                     if category_id:
                         c.execute('INSERT INTO post_categories (post_id, category_id) VALUES (?, ?)',
                                   (post_id, category_id))
             
             conn.commit()
+            self._invalidate('posts', 'categories')
             print(f"Post created successfully (ID: {post_id})")
             return post_id
             
@@ -137,6 +267,7 @@ class SimpleBlogPlatform:
                 return False
             
             conn.commit()
+            self._invalidate(f'post:{post_id}', 'posts')
             print("Post updated successfully")
             return True
             
@@ -166,6 +297,7 @@ class SimpleBlogPlatform:
                 return False
             
             conn.commit()
+            self._invalidate(f'post:{post_id}', 'posts', 'categories', f'comments:{post_id}')
             print("Post deleted successfully")
             return True
             
@@ -174,55 +306,51 @@ class SimpleBlogPlatform:
     
     def get_post(self, post_id: int = None, slug: str = None) -> Optional[Dict]:
         """Get a specific post by ID or slug"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        
         if post_id:
-            c.execute('''SELECT p.*, GROUP_CONCAT(c.name, ', ') as categories
-                         FROM posts p
-                         LEFT JOIN post_categories pc ON p.id = pc.post_id
-                         LEFT JOIN categories c ON pc.category_id = c.id
-                         WHERE p.id = ?
-                         GROUP BY p.id''', (post_id,))
+            condition, param = 'p.id = ?', post_id
         elif slug:
-            c.execute('''SELECT p.*, GROUP_CONCAT(c.name, ', ') as categories
-                         FROM posts p
-                         LEFT JOIN post_categories pc ON p.id = pc.post_id
-                         LEFT JOIN categories c ON pc.category_id = c.id
-                         WHERE p.slug = ?
-                         GROUP BY p.id''', (slug,))
+            condition, param = 'p.slug = ?', slug
         else:
-            conn.close()
             return None
         
+        key = ('get_post', condition, param)
+        post = self._cache_get(key)
+        if post is not MISS:
+            return post
+        
+        conn = sqlite3.connect(self.db_name)
+        c = conn.cursor()
+        
+        c.execute(f'SELECT {POST_COLUMNS} FROM posts p WHERE {condition}', (param,))
         row = c.fetchone()
         conn.close()
         
+        # Misses are not cached: a later create_post could make them stale
         if not row:
             return None
         
-        return {
-            'id': row[0],
-            'title': row[1],
-            'content': row[2],
-            'author': row[3],
-            'created_at': row[4],
-            'updated_at': row[5],
-            'published': bool(row[6]),
-            'slug': row[7],
-            'categories': row[8] if row[8] else ''
-        }
+        post = self._row_to_post(row)
+        self._cache_set(key, post, f"post:{post['id']}")
+        return post
     
     def get_posts(self, published_only: bool = True, category: str = None, 
-                 limit: int = None, offset: int = 0) -> List[Dict]:
-        """Get multiple posts with optional filtering"""
+                 limit: int = None, offset: int = 0,
+                 after: Optional[Tuple[str, int]] = None) -> List[Dict]:
+        """Get multiple posts with optional filtering
+        
+        Posts are ordered newest first by (created_at, id). Pass the
+        (created_at, id) of the last post of a page as ``after`` to fetch the
+        next page; unlike ``offset`` this costs the same on every page.
+        """
+        key = ('get_posts', published_only, category, limit, offset, tuple(after) if after else None)
+        posts = self._cache_get(key)
+        if posts is not MISS:
+            return posts
+        
         conn = sqlite3.connect(self.db_name)
         c = conn.cursor()
         
-        query = '''SELECT p.*, GROUP_CONCAT(c.name, ', ') as categories
-                   FROM posts p
-                   LEFT JOIN post_categories pc ON p.id = pc.post_id
-                   LEFT JOIN categories c ON pc.category_id = c.id'''
+        query = f'SELECT {POST_COLUMNS} FROM posts p'
         
         conditions = []
         params = []
@@ -231,42 +359,72 @@ class SimpleBlogPlatform:
             conditions.append('p.published = TRUE')
         
         if category:
-            conditions.append('c.name = ?')
+            conditions.append('''EXISTS (SELECT 1 FROM post_categories pc
+                                      JOIN categories c ON pc.category_id = c.id
+                                      WHERE pc.post_id = p.id AND c.name = ?)''')
             params.append(category)
         
+        if after:
+            conditions.append('(p.created_at, p.id) < (?, ?)')
+            params.extend(after)
+        
         if conditions:
             query += ' WHERE ' + ' AND '.join(conditions)
         
-        query += ' GROUP BY p.id ORDER BY p.created_at DESC'
+        query += ' ORDER BY p.created_at DESC, p.id DESC'
         
         if limit:
             query += ' LIMIT ? OFFSET ?'
             params.extend([limit, offset])
         
         c.execute(query, params)
-        posts = []
-        
-        for row in c.fetchall():
-            post = {
-                'id': row[0],
-                'title': row[1],
-                'content': row[2],
-                'author': row[3],
-                'created_at': row[4],
-                'updated_at': row[5],
-                'published': bool(row[6]),
-                'slug': row[7],
-                'categories': row[8] if row[8] else ''
-            }
-            posts.append(post)
+        posts = [self._row_to_post(row) for row in c.fetchall()]
         
         conn.close()
+        self._cache_set(key, posts, 'posts')
         return posts
     
-    def get_or_create_category(self, category_name: str) -> Optional[int]:
-        """Get category ID or create if it doesn't exist"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+    def get_posts_page(self, published_only: bool = True, category: str = None,
+                       limit: int = 10,
+                       cursor: Optional[Tuple[str, int]] = None) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+        """Get one page of posts and the cursor for the next page
+        
+        The returned cursor is None once there are no more posts.
+        """
+        posts = self.get_posts(published_only, category, limit + 1, after=cursor)
+        
+        if len(posts) <= limit:
+            return posts, None
+        
+        posts = posts[:limit]
+        return posts, (posts[-1]['created_at'], posts[-1]['id'])
+    
+    @staticmethod
+    def _row_to_post(row) -> Dict:
+        """Convert a row selected with POST_COLUMNS to a post dict"""
+        return {
+            'id': row[0],
+            'title': row[1],
+            'content': row[2],
+            'author': row[3],
+            'created_at': row[4],
+            'updated_at': row[5],
+            'published': bool(row[6]),
+            'slug': row[7],
+            'comment_count': row[8],
+            'approved_comment_count': row[9],
+            'categories': row[10] if row[10] else ''
+        }
+    
+    def get_or_create_category(self, category_name: str,
+                               cursor: sqlite3.Cursor = None) -> Optional[int]:
+        """Get category ID or create if it doesn't exist
+        
+        Pass the cursor of an open transaction to create the category inside
+        it; the caller is then responsible for committing.
+        """
+        conn = None if cursor else sqlite3.connect(self.db_name)
+        c = cursor or conn.cursor()
         
         c.execute('SELECT id FROM categories WHERE name = ?', (category_name,))
         row = c.fetchone()
@@ -276,21 +434,24 @@ class SimpleBlogPlatform:
         else:
             c.execute('INSERT INTO categories (name) VALUES (?)', (category_name,))
             category_id = c.lastrowid
-            conn.commit()
+            if conn:
+                conn.commit()
+                self._invalidate('categories')
         
-        conn.close()
+        if conn:
+            conn.close()
         return category_id
     
     def get_categories(self) -> List[Dict]:
         """Get all categories with post counts"""
+        categories = self._cache_get(('get_categories',))
+        if categories is not MISS:
+            return categories
+        
         conn = sqlite3.connect(self.db_name)
         c = conn.cursor()
         
-        c.execute('''SELECT c.id, c.name, c.description, COUNT(pc.post_id) as post_count
-                     FROM categories c
-                     LEFT JOIN post_categories pc ON c.id = pc.category_id
-                     GROUP BY c.id
-                     ORDER BY c.name''')
+        c.execute('SELECT id, name, description, post_count FROM categories ORDER BY name')
         
         categories = []
         for row in c.fetchall():
@@ -302,6 +463,7 @@ class SimpleBlogPlatform:
             })
         
         conn.close()
+        self._cache_set(('get_categories',), categories, 'categories')
         return categories
     
     def add_comment(self, post_id: int, author: str, content: str, approved: bool = False) -> Optional[int]:
@@ -320,14 +482,37 @@ class SimpleBlogPlatform:
             
             comment_id = c.lastrowid
             conn.commit()
+            self._invalidate(f'comments:{post_id}', f'post:{post_id}', 'posts')
             print("Comment added successfully")
             return comment_id
             
         finally:
             conn.close()
     
+    def repair_counters(self) -> int:
+        """Recompute category and comment counters, returning rows corrected"""
+        conn = sqlite3.connect(self.db_name)
+        
+        try:
+            with conn:
+                fixed = sum(conn.execute(statement).rowcount for statement in REPAIR_COUNTERS)
+        finally:
+            conn.close()
+        
+        # Any cached post or category may carry a stale count
+        if fixed and self.cache is not None:
+            self.cache.clear()
+        
+        print(f"Counters repaired ({fixed} rows corrected)")
+        return fixed
+    
     def get_comments(self, post_id: int, approved_only: bool = True) -> List[Dict]:
         """Get comments for a post"""
+        key = ('get_comments', post_id, approved_only)
+        comments = self._cache_get(key)
+        if comments is not MISS:
+            return comments
+        
         conn = sqlite3.connect(self.db_name)
         c = conn.cursor()
         
@@ -353,6 +538,7 @@ class SimpleBlogPlatform:
             })
         
         conn.close()
+        self._cache_set(key, comments, f'comments:{post_id}')
         return comments
     
     def approve_comment(self, comment_id: int) -> bool:
@@ -360,6 +546,8 @@ class SimpleBlogPlatform:
         conn = sqlite3.connect(self.db_name)
         c = conn.cursor()
         
+        c.execute('SELECT post_id FROM comments WHERE id = ?', (comment_id,))
+        row = c.fetchone()
         c.execute('UPDATE comments SET approved = TRUE WHERE id = ?', (comment_id,))
         
         if c.rowcount == 0:
@@ -369,6 +557,7 @@ class SimpleBlogPlatform:
         
         conn.commit()
         conn.close()
+        self._invalidate(f'comments:{row[0]}', f'post:{row[0]}', 'posts')
         print("Comment approved")
         return True
     
@@ -377,6 +566,8 @@ class SimpleBlogPlatform:
         conn = sqlite3.connect(self.db_name)
         c = conn.cursor()
         
+        c.execute('SELECT post_id FROM comments WHERE id = ?', (comment_id,))
+        row = c.fetchone()
         c.execute('DELETE FROM comments WHERE id = ?', (comment_id,))
         
         if c.rowcount == 0:
@@ -386,9 +577,149 @@ class SimpleBlogPlatform:
         
         conn.commit()
         conn.close()
+        self._invalidate(f'comments:{row[0]}', f'post:{row[0]}', 'posts')
         print("Comment deleted")
         return True
     
+    def approve_comments(self, comment_ids: Iterable[int] = None, post_id: int = None,
+                         author: str = None, pattern: str = None,
+                         older_than: timedelta = None) -> int:
+        """Approve pending comments in one transaction, returning how many changed
+        
+        Comments are selected by a list of IDs and/or the predicates of
+        _comment_filter; at least one selector is required.
+        """
+        conditions, params = self._comment_filter(post_id, author, pattern, older_than)
+        count = self._moderate('UPDATE comments SET approved = TRUE', conditions, params,
+                               comment_ids, ['approved = FALSE'])
+        print(f"{count} comments approved")
+        return count
+    
+    def delete_comments(self, comment_ids: Iterable[int] = None, post_id: int = None,
+                        author: str = None, pattern: str = None,
+                        older_than: timedelta = None, pending_only: bool = False) -> int:
+        """Delete comments in one transaction, returning how many were removed
+        
+        Takes the same selectors as approve_comments; ``pending_only`` keeps
+        approved comments, which is what spam sweeps usually want.
+        """
+        conditions, params = self._comment_filter(post_id, author, pattern, older_than)
+        count = self._moderate('DELETE FROM comments', conditions, params, comment_ids,
+                               ['approved = FALSE'] if pending_only else [])
+        print(f"{count} comments deleted")
+        return count
+    
+    @staticmethod
+    def _comment_filter(post_id: int = None, author: str = None, pattern: str = None,
+                        older_than: timedelta = None) -> Tuple[List[str], List]:
+        """Build WHERE conditions selecting comments
+        
+        ``pattern`` is a regular expression searched in the comment content and
+        ``older_than`` selects comments created more than that long ago.
+        """
+        conditions = []
+        params = []
+        
+        if post_id is not None:
+            conditions.append('post_id = ?')
+            params.append(post_id)
+        
+        if author is not None:
+            conditions.append('author = ?')
+            params.append(author)
+        
+        if pattern is not None:
+            re.compile(pattern)  # fail fast on an invalid expression
+            conditions.append('content REGEXP ?')
+            params.append(pattern)
+        
+        if older_than is not None:
+            # CURRENT_TIMESTAMP defaults are stored in UTC
+            cutoff = datetime.now(timezone.utc) - older_than
+            conditions.append('created_at < ?')
+            params.append(cutoff.strftime('%Y-%m-%d %H:%M:%S'))
+        
+        return conditions, params
+    
+    def _moderate(self, statement: str, conditions: List[str], params: List,
+                  comment_ids: Iterable[int] = None, extra_conditions: List[str] = ()) -> int:
+        """Run a set-based comment update/delete in a single transaction"""
+        if comment_ids is None and not conditions:
+            raise ValueError("Select comments by IDs, post, author, pattern or age")
+        conditions = conditions + list(extra_conditions)
+        
+        if comment_ids is None:
+            batches = [([], [])]
+        else:
+            comment_ids = list(comment_ids)
+            batches = [([f"id IN ({', '.join('?' * len(chunk))})"], chunk)
+                       for chunk in (comment_ids[i:i + ID_CHUNK_SIZE]
+                                     for i in range(0, len(comment_ids), ID_CHUNK_SIZE))]
+        
+        conn = sqlite3.connect(self.db_name)
+        compiled = {}
+        
+        def regexp(expr, value):
+            # Compile each expression once, not once per row
+            if expr not in compiled:
+                compiled[expr] = re.compile(expr)
+            return value is not None and compiled[expr].search(value) is not None
+        
+        conn.create_function('REGEXP', 2, regexp, deterministic=True)
+        
+        count = 0
+        post_ids = set()
+        
+        try:
+            with conn:
+                for batch_conditions, batch_params in batches:
+                    where = ' AND '.join(batch_conditions + conditions)
+                    where_params = batch_params + params
+                    post_ids.update(row[0] for row in conn.execute(
+                        f'SELECT DISTINCT post_id FROM comments WHERE {where}', where_params))
+                    count += conn.execute(f'{statement} WHERE {where}', where_params).rowcount
+        finally:
+            conn.close()
+        
+        if count:
+            self._invalidate('posts', *(f'{prefix}:{post_id}' for post_id in post_ids
+                                        for prefix in ('comments', 'post')))
+        return count
+    
+    def get_moderation_queue(self, limit: int = 50,
+                             cursor: Optional[Tuple[str, int]] = None) -> Tuple[List[Dict], Optional[Tuple[str, int]]]:
+        """Get a page of pending comments, oldest first, and the next page's cursor"""
+        conn = sqlite3.connect(self.db_name)
+        c = conn.cursor()
+        
+        query = 'SELECT * FROM comments WHERE approved = FALSE'
+        params = []
+        
+        if cursor:
+            query += ' AND (created_at, id) > (?, ?)'
+            params.extend(cursor)
+        
+        query += ' ORDER BY created_at, id LIMIT ?'
+        params.append(limit + 1)
+        
+        c.execute(query, params)
+        comments = [{
+            'id': row[0],
+            'post_id': row[1],
+            'author': row[2],
+            'content': row[3],
+            'created_at': row[4],
+            'approved': bool(row[5])
+        } for row in c.fetchall()]
+        
+        conn.close()
+        
+        if len(comments) <= limit:
+            return comments, None
+        
+        comments = comments[:limit]
+        return comments, (comments[-1]['created_at'], comments[-1]['id'])
+    
     def export_posts(self, filename: str = 'blog_export.json'):
         """Export all posts to JSON"""
         posts = self.get_posts(published_only=False)
@@ -479,9 +810,10 @@ def main():
         print("9. Moderate Comments")
         print("10. Export Posts")
         print("11. Import Posts")
-        print("12. Exit")
+        print("12. Repair Counters")
+        print("13. Exit")
         
-        choice = input("\nEnter your choice (1-12): ").strip()
+        choice = input("\nEnter your choice (1-13): ").strip()
         
         if choice == "1":
             print("\nCreate New Post")
@@ -614,8 +946,11 @@ def main():
             print("\nComment Moderation")
             print("1. Approve comment")
             print("2. Delete comment")
+            print("3. Show moderation queue")
+            print("4. Approve all pending comments on a post")
+            print("5. Delete pending comments matching a pattern")
             
-            mod_choice = input("Enter choice (1-2): ").strip()
+            mod_choice = input("Enter choice (1-5): ").strip()
             
             if mod_choice == "1":
                 comment_id = input("Enter Comment ID to approve: ").strip()
@@ -631,6 +966,36 @@ def main():
                 else:
                     print("Invalid comment ID")
             
+            elif mod_choice == "3":
+                cursor = None
+                while True:
+                    comments, cursor = blog.get_moderation_queue(20, cursor)
+                    if not comments:
+                        print("No pending comments")
+                        break
+                    for comment in comments:
+                        print(f"{comment['id']} (post {comment['post_id']}) {comment['author']}: "
+                              f"{comment['content']} ({comment['created_at']})")
+                    if not cursor or input("More? (y/n): ").strip().lower() != 'y':
+                        break
+            
+            elif mod_choice == "4":
+                post_id = input("Enter Post ID: ").strip()
+                if post_id.isdigit():
+                    blog.approve_comments(post_id=int(post_id))
+                else:
+                    print("Invalid post ID")
+            
+            elif mod_choice == "5":
+                pattern = input("Regular expression: ").strip()
+                if not pattern:
+                    print("Pattern is required")
+                    continue
+                try:
+                    blog.delete_comments(pattern=pattern, pending_only=True)
+                except re.error as e:
+                    print(f"Invalid pattern: {e}")
+            
             else:
                 print("Invalid choice")
         
@@ -645,6 +1010,9 @@ def main():
                 blog.import_posts(filename)
         
         elif choice == "12":
+            blog.repair_counters()
+        
+        elif choice == "13":
             print("Goodbye!")
             break
         
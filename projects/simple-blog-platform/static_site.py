@@ -0,0 +1,256 @@
+"""Static site generator for SimpleBlogPlatform.
+
+Renders every published post, the paginated front page and a paginated index
+per category to plain HTML files that any web server can serve from disk.
+
+Builds are incremental: each output file is recorded in a manifest together
+with a fingerprint of the data it was rendered from (for posts this includes
+``updated_at`` and the IDs of the approved comments). On the next build only
+files whose fingerprint changed are rendered again, and files that no longer
+correspond to anything are removed.
+Rendering is spread over a pool of worker processes.
+
+    python static_site.py --db blog.db --out site --workers 4
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import sqlite3
+import time
+from multiprocessing import Pool
+from typing import Dict, List
+
+import markdown
+
+from main import SimpleBlogPlatform
+
+MANIFEST_NAME = '.manifest.json'
+
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+</head>
+<body>
+<header><a href="{root}index.html">Home</a></header>
+<main>
+{body}
+</main>
+</body>
+</html>
+'''
+
+# Blog instance of the current worker process, created by _init_worker
+_worker_blog = None
+
+
+def _init_worker(db_name: str):
+    global _worker_blog
+    _worker_blog = SimpleBlogPlatform(db_name)
+
+
+def _write(path: str, content: str):
+    """Write a file atomically so a web server never serves half a page"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def _post_summary(post: Dict, root: str) -> str:
+    categories = f" &middot; {html.escape(post['categories'])}" if post['categories'] else ''
+    return (f'<article>\n<h2><a href="{root}posts/{post["slug"]}.html">{html.escape(post["title"])}</a></h2>\n'
+            f'<p>{html.escape(post["author"])} &middot; {post["created_at"]}{categories} '
+            f'&middot; {post["approved_comment_count"]} comments</p>\n</article>')
+
+
+def render_post(output_dir: str, post_id: int, path: str) -> str:
+    """Render one post page with its approved comments (runs in a worker)"""
+    post = _worker_blog.get_post(post_id)
+    comments = _worker_blog.get_comments(post_id)
+    root = '../'
+
+    body = [f'<article>\n<h1>{html.escape(post["title"])}</h1>',
+            f'<p>By {html.escape(post["author"])} on {post["created_at"]}</p>']
+    if post['categories']:
+        links = ', '.join(
+            f'<a href="{root}categories/{_worker_blog.generate_slug(name)}/index.html">{html.escape(name)}</a>'
+            for name in post['categories'].split(', '))
+        body.append(f'<p>Categories: {links}</p>')
+    body.append(markdown.markdown(post['content']))
+    body.append('</article>')
+
+    body.append(f'<section>\n<h2>Comments ({len(comments)})</h2>')
+    for comment in comments:
+        body.append(f'<p><strong>{html.escape(comment["author"])}</strong> ({comment["created_at"]}): '
+                    f'{html.escape(comment["content"])}</p>')
+    body.append('</section>')
+
+    _write(os.path.join(output_dir, path),
+           PAGE_TEMPLATE.format(title=html.escape(post['title']), root=root, body='\n'.join(body)))
+    return path
+
+
+def render_listing(output_dir: str, path: str, heading: str, posts: List[Dict],
+                   page: int, page_count: int, root: str) -> str:
+    """Render one page of a post listing (runs in a worker)"""
+    body = [f'<h1>{html.escape(heading)}</h1>']
+    body.extend(_post_summary(post, root) for post in posts)
+
+    nav = []
+    if page > 1:
+        nav.append(f'<a href="{_listing_file(page - 1)}">Newer</a>')
+    if page < page_count:
+        nav.append(f'<a href="{_listing_file(page + 1)}">Older</a>')
+    if nav:
+        body.append(f'<nav>{" | ".join(nav)}</nav>')
+
+    _write(os.path.join(output_dir, path),
+           PAGE_TEMPLATE.format(title=html.escape(heading), root=root, body='\n'.join(body)))
+    return path
+
+
+def _listing_file(page: int) -> str:
+    return 'index.html' if page == 1 else f'page-{page}.html'
+
+
+def _fingerprint(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class StaticSiteExporter:
+    """Incrementally export the published blog to static HTML"""
+
+    def __init__(self, blog: SimpleBlogPlatform, output_dir: str = 'site',
+                 page_size: int = 10, workers: int = None):
+        self.blog = blog
+        self.output_dir = output_dir
+        self.page_size = page_size
+        self.workers = workers or os.cpu_count() or 1
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+
+    def load_manifest(self) -> Dict[str, str]:
+        """Return the output path -> fingerprint map of the previous build"""
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)['pages']
+        except (FileNotFoundError, KeyError, ValueError):
+            return {}
+
+    def published_posts(self) -> List[Dict]:
+        """Metadata of all published posts, newest first, without their content"""
+        conn = sqlite3.connect(self.blog.db_name)
+        c = conn.cursor()
+        c.execute('''SELECT p.id, p.title, p.author, p.created_at, p.updated_at, p.slug,
+                            p.approved_comment_count,
+                            (SELECT GROUP_CONCAT(id) FROM
+                             (SELECT id FROM comments
+                              WHERE post_id = p.id AND approved ORDER BY id)) AS approved_comment_ids,
+                            (SELECT GROUP_CONCAT(c.name, ', ')
+                             FROM post_categories pc
+                             JOIN categories c ON pc.category_id = c.id
+                             WHERE pc.post_id = p.id) AS categories
+                     FROM posts p
+                     WHERE p.published = TRUE
+                     ORDER BY p.created_at DESC, p.id DESC''')
+        posts = [{'id': row[0], 'title': row[1], 'author': row[2], 'created_at': row[3],
+                  'updated_at': row[4], 'slug': row[5], 'approved_comment_count': row[6],
+                  'approved_comment_ids': row[7] or '', 'categories': row[8] or ''}
+                 for row in c.fetchall()]
+        conn.close()
+        return posts
+
+    def plan(self, posts: List[Dict]) -> Dict[str, tuple]:
+        """Map every output path to (fingerprint, render function, arguments)"""
+        pages = {}
+
+        for post in posts:
+            path = os.path.join('posts', f"{post['slug']}.html")
+            # The approved comment IDs, not just their count: deleting one
+            # comment and approving another must still re-render the page
+            pages[path] = (_fingerprint(post), render_post, (self.output_dir, post['id'], path))
+
+        self._plan_listing(pages, '', 'Latest Posts', posts, './')
+
+        by_category = {}
+        for post in posts:
+            for name in filter(None, post['categories'].split(', ')):
+                by_category.setdefault(name, []).append(post)
+
+        for name, category_posts in by_category.items():
+            directory = os.path.join('categories', self.blog.generate_slug(name))
+            self._plan_listing(pages, directory, f'Category: {name}', category_posts, '../../')
+
+        return pages
+
+    def _plan_listing(self, pages: Dict[str, tuple], directory: str, heading: str,
+                      posts: List[Dict], root: str):
+        page_count = max(1, -(-len(posts) // self.page_size))
+        for page in range(1, page_count + 1):
+            page_posts = posts[(page - 1) * self.page_size:page * self.page_size]
+            path = os.path.join(directory, _listing_file(page))
+            # Listings show only the comment count
+            shown = [{key: value for key, value in post.items() if key != 'approved_comment_ids'}
+                     for post in page_posts]
+            pages[path] = (_fingerprint(heading, page, page_count, shown), render_listing,
+                           (self.output_dir, path, heading, page_posts, page, page_count, root))
+
+    def build(self, full: bool = False) -> Dict[str, int]:
+        """Render changed pages and remove stale ones; returns build statistics"""
+        started = time.perf_counter()
+        previous = {} if full else self.load_manifest()
+        pages = self.plan(self.published_posts())
+
+        stale = [path for path, (fingerprint, _, _) in pages.items()
+                 if previous.get(path) != fingerprint
+                 or not os.path.exists(os.path.join(self.output_dir, path))]
+        removed = [path for path in previous if path not in pages]
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        if stale:
+            jobs = [(pages[path][1], pages[path][2]) for path in stale]
+            if self.workers > 1 and len(jobs) > 1:
+                with Pool(self.workers, initializer=_init_worker, initargs=(self.blog.db_name,)) as pool:
+                    for result in [pool.apply_async(func, args) for func, args in jobs]:
+                        result.get()
+            else:
+                _init_worker(self.blog.db_name)
+                for func, args in jobs:
+                    func(*args)
+
+        for path in removed:
+            try:
+                os.remove(os.path.join(self.output_dir, path))
+            except FileNotFoundError:
+                pass
+
+        _write(self.manifest_path, json.dumps({
+            'built_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'pages': {path: fingerprint for path, (fingerprint, _, _) in pages.items()},
+        }))
+
+        stats = {'pages': len(pages), 'rendered': len(stale), 'removed': len(removed)}
+        print(f"Built {self.output_dir}: {stats['rendered']} of {stats['pages']} pages rendered, "
+              f"{stats['removed']} removed ({time.perf_counter() - started:.2f}s)")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the blog to static HTML')
+    parser.add_argument('--db', default='blog.db', help='blog database file')
+    parser.add_argument('--out', default='site', help='output directory')
+    parser.add_argument('--page-size', type=int, default=10, help='posts per listing page')
+    parser.add_argument('--workers', type=int, default=None, help='render processes (default: CPU count)')
+    parser.add_argument('--full', action='store_true', help='ignore the manifest and render everything')
+    args = parser.parse_args()
+
+    exporter = StaticSiteExporter(SimpleBlogPlatform(args.db), args.out, args.page_size, args.workers)
+    exporter.build(full=args.full)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""SQLite-backed cache of API responses for StockTracker.
+
+Each (symbol, kind) pair, e.g. ('AAPL', 'quote') or ('AAPL',
+'historical_full'), is one row, so reading or updating an entry touches
+only that entry: nothing is loaded at startup and nothing else is
+rewritten. Every write is its own transaction, so a crash never leaves a
+half-written cache. Entries expire ttl seconds after they are stored;
+expired entries are ignored on read and removed by purge_expired().
+
+Entries are JSON, or opaque bytes (get_blob/put_blob) for data with its
+own binary format, such as NumPy price histories.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class CacheStore:
+    """Per-symbol, per-kind cache entries in a SQLite file"""
+
+    def __init__(self, path='stock_cache.db'):
+        self.path = path
+        # Shared by the fetching threads; the lock serializes its use
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS entries
+                                 (symbol TEXT NOT NULL,
+                                  kind TEXT NOT NULL,
+                                  cached_at REAL NOT NULL,
+                                  expires_at REAL NOT NULL,
+                                  data TEXT NOT NULL,
+                                  PRIMARY KEY (symbol, kind)) WITHOUT ROWID''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries (expires_at)')
+            self.conn.execute('''CREATE TABLE IF NOT EXISTS blobs
+                                 (symbol TEXT NOT NULL,
+                                  kind TEXT NOT NULL,
+                                  cached_at REAL NOT NULL,
+                                  expires_at REAL NOT NULL,
+                                  data BLOB NOT NULL,
+                                  PRIMARY KEY (symbol, kind)) WITHOUT ROWID''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_blobs_expires ON blobs (expires_at)')
+
+    def get(self, symbol, kind):
+        """Get an entry's data, or None if it is missing or expired"""
+        with self.lock:
+            row = self.conn.execute('SELECT data FROM entries WHERE symbol = ? AND kind = ? AND expires_at > ?',
+                                    (symbol, kind, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, symbol, kind, data, ttl):
+        """Store an entry, replacing the previous one"""
+        self.put_many([(symbol, kind, data)], ttl)
+
+    def put_many(self, entries, ttl, cached_at=None):
+        """Store (symbol, kind, data) entries in one transaction"""
+        cached_at = cached_at or time.time()
+        rows = [(symbol, kind, cached_at, cached_at + ttl, json.dumps(data, separators=(',', ':')))
+                for symbol, kind, data in entries]
+        with self.lock, self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO entries (symbol, kind, cached_at, expires_at, data) '
+                                  'VALUES (?, ?, ?, ?, ?)', rows)
+
+    def get_blob(self, symbol, kind):
+        """Get a bytes entry, or None if it is missing or expired"""
+        with self.lock:
+            row = self.conn.execute('SELECT data FROM blobs WHERE symbol = ? AND kind = ? AND expires_at > ?',
+                                    (symbol, kind, time.time())).fetchone()
+        return row[0] if row else None
+
+    def put_blob(self, symbol, kind, data, ttl):
+        """Store a bytes entry, replacing the previous one"""
+        cached_at = time.time()
+        with self.lock, self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO blobs (symbol, kind, cached_at, expires_at, data) '
+                              'VALUES (?, ?, ?, ?, ?)', (symbol, kind, cached_at, cached_at + ttl, data))
+
+    def delete(self, symbol, kind=None):
+        """Remove one entry, or every entry of a symbol"""
+        with self.lock, self.conn:
+            for table in ('entries', 'blobs'):
+                if kind is None:
+                    self.conn.execute(f'DELETE FROM {table} WHERE symbol = ?', (symbol,))
+                else:
+                    self.conn.execute(f'DELETE FROM {table} WHERE symbol = ? AND kind = ?', (symbol, kind))
+
+    def purge_expired(self):
+        """Delete expired entries; returns how many were removed"""
+        now = time.time()
+        with self.lock, self.conn:
+            return sum(self.conn.execute(f'DELETE FROM {table} WHERE expires_at <= ?', (now,)).rowcount
+                       for table in ('entries', 'blobs'))
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.conn.execute(
+                '''SELECT SUM(n), SUM(size) FROM
+                   (SELECT COUNT(*) AS n, COALESCE(SUM(LENGTH(data)), 0) AS size FROM entries
+                    UNION ALL SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blobs)''').fetchone()
+        return {'entries': entries, 'data_bytes': size}
+
+    def import_json(self, json_file, ttls):
+        """Copy entries from the old stock_cache.json format
+
+        ttls maps each kind to its ttl; entries keep their original cache
+        time, so stale ones are imported already expired. Returns the number
+        of entries imported.
+        """
+        with open(json_file, 'r') as f:
+            cache = json.load(f)
+        count = 0
+        for symbol, kinds in cache.items():
+            for kind, entry in kinds.items():
+                if kind not in ttls:
+                    continue
+                cached_at = time.mktime(time.strptime(entry['cache_time'][:19], '%Y-%m-%dT%H:%M:%S'))
+                self.put_many([(symbol, kind, entry['data'])], ttls[kind], cached_at)
+                count += 1
+        return count
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def migrate_json_cache(store, json_file, ttls):
+    """Import an old JSON cache file once, then rename it out of the way"""
+    if not os.path.exists(json_file):
+        return 0
+    try:
+        count = store.import_json(json_file, ttls)
+    except (OSError, ValueError, KeyError, AttributeError) as e:
+        print(f"Could not import {json_file}: {e}")
+        return 0
+    os.replace(json_file, json_file + '.imported')
+    return count
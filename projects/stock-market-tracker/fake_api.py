@@ -0,0 +1,154 @@
+"""Stand-in for the Alpha Vantage API, for testing without a key or quota.
+
+Serves GLOBAL_QUOTE and TIME_SERIES_DAILY with the same JSON layout as the
+real API, using prices made up from the symbol, so results are repeatable.
+It can also simulate the API's rate limit message, server errors and slow
+responses:
+
+    python fake_api.py --port 8099 --error-rate 0.1 --delay 0.2
+    ALPHAVANTAGE_BASE_URL=http://127.0.0.1:8099/query python main.py
+
+or from Python:
+
+    server, base_url = start_server()
+    tracker = StockTracker(base_url=base_url, requests_per_minute=6000)
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Trading days returned by outputsize=compact and outputsize=full
+COMPACT_DAYS = 100
+FULL_DAYS = 5000
+
+
+def make_history(symbol, days):
+    """Daily bars for symbol, newest first, as the API returns them"""
+    rng = random.Random(zlib.crc32(symbol.encode()))
+    price = rng.uniform(10, 500)
+    bars = {}
+    day = date(2024, 1, 2)
+    for _ in range(days):
+        # Skip weekends
+        while day.weekday() >= 5:
+            day -= timedelta(days=1)
+        close = price
+        price = max(1.0, price * (1 + rng.gauss(0, 0.02)))
+        bars[day.isoformat()] = {
+            '1. open': f'{price:.4f}',
+            '2. high': f'{max(price, close) * 1.01:.4f}',
+            '3. low': f'{min(price, close) * 0.99:.4f}',
+            '4. close': f'{close:.4f}',
+            '5. volume': str(rng.randint(100_000, 50_000_000)),
+        }
+        day -= timedelta(days=1)
+    return bars
+
+
+def make_quote(symbol):
+    history = make_history(symbol, 2)
+    (latest_day, latest), (_, previous) = history.items()
+    price, previous_close = float(latest['4. close']), float(previous['4. close'])
+    change = price - previous_close
+    return {
+        '01. symbol': symbol,
+        '02. open': latest['1. open'],
+        '03. high': latest['2. high'],
+        '04. low': latest['3. low'],
+        '05. price': latest['4. close'],
+        '06. volume': latest['5. volume'],
+        '07. latest trading day': latest_day,
+        '08. previous close': previous['4. close'],
+        '09. change': f'{change:.4f}',
+        '10. change percent': f'{change / previous_close * 100:.4f}%',
+    }
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    """Answers API requests; the failure settings live on the server"""
+
+    def do_GET(self):
+        params = {name: values[0] for name, values in parse_qs(urlparse(self.path).query).items()}
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        self.server.requests += 1
+
+        roll = random.random()
+        if roll < self.server.error_rate:
+            self.send_json({'error': 'simulated failure'}, status=503)
+            return
+        if roll < self.server.error_rate + self.server.rate_limit_rate:
+            # The real API answers 200 with a note when over the quota
+            self.send_json({'Note': 'Thank you for using Alpha Vantage! Our standard API rate limit '
+                                    'is 5 requests per minute.'})
+            return
+
+        symbol = params.get('symbol', '').upper()
+        function = params.get('function')
+        if not symbol or symbol.startswith('INVALID'):
+            self.send_json({'Error Message': 'Invalid API call. Please retry or visit the documentation.'})
+        elif function == 'GLOBAL_QUOTE':
+            self.send_json({'Global Quote': make_quote(symbol)})
+        elif function == 'TIME_SERIES_DAILY':
+            days = FULL_DAYS if params.get('outputsize') == 'full' else COMPACT_DAYS
+            self.send_json({
+                'Meta Data': {'2. Symbol': symbol},
+                'Time Series (Daily)': make_history(symbol, days),
+            })
+        else:
+            self.send_json({'Error Message': f'Unknown function: {function}'})
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(host='127.0.0.1', port=0, error_rate=0.0, rate_limit_rate=0.0, delay=0.0):
+    """Serve the fake API from a background thread; returns (server, base_url)
+
+    port=0 picks a free port. Call server.shutdown() to stop it;
+    server.requests counts the requests answered.
+    """
+    server = ThreadingHTTPServer((host, port), FakeAPIHandler)
+    server.daemon_threads = True
+    server.error_rate = error_rate
+    server.rate_limit_rate = rate_limit_rate
+    server.delay = delay
+    server.requests = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_address[1]}/query'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a stand-in for the Alpha Vantage API')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8099, help='port to listen on')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0,
+                        help='fraction of requests answered with the rate limit note')
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to wait before answering')
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.host, args.port, args.error_rate, args.rate_limit_rate, args.delay)
+    print(f"Fake API serving on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
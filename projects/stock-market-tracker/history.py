@@ -0,0 +1,95 @@
+"""Daily price history as typed NumPy columns.
+
+The API returns a dict of date string -> dict of string fields. It is
+parsed once into a PriceHistory: a datetime64 date column with float64
+open/high/low/close and int64 volume columns, sorted oldest first. All
+analytics work on whole columns, and the cache stores histories in NumPy's
+compressed .npz format, so cached data is never parsed again.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+# Column name -> field name in the API response
+API_FIELDS = {
+    'open': '1. open',
+    'high': '2. high',
+    'low': '3. low',
+    'close': '4. close',
+    'volume': '5. volume',
+}
+
+# Trading days in a year, for annualizing volatility
+TRADING_DAYS = 252
+
+
+class PriceHistory:
+    """Daily bars of one symbol, oldest first"""
+
+    COLUMNS = ('dates', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, dates, open, high, low, close, volume):
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        self.volume = np.asarray(volume, dtype=np.int64)
+
+    @classmethod
+    def from_api(cls, series):
+        """Parse a 'Time Series (Daily)' dict; raises ValueError on bad data"""
+        dates = np.array(list(series), dtype='datetime64[D]')
+        bars = list(series.values())
+        # NumPy converts the strings in C; only the field lookup is Python
+        columns = {name: np.array([bar[field] for bar in bars]) for name, field in API_FIELDS.items()}
+        order = np.argsort(dates, kind='stable')
+        return cls(dates[order], **{name: column[order].astype(np.float64 if name != 'volume' else np.int64)
+                                    for name, column in columns.items()})
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data)) as arrays:
+            return cls(**{name: arrays[name] for name in cls.COLUMNS})
+
+    def to_bytes(self):
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **{name: getattr(self, name) for name in self.COLUMNS})
+        return buffer.getvalue()
+
+    def __len__(self):
+        return len(self.dates)
+
+    def last(self, days):
+        """The most recent days bars"""
+        start = max(len(self) - days, 0)
+        return PriceHistory(*(getattr(self, name)[start:] for name in self.COLUMNS))
+
+    def to_frame(self):
+        """A pandas DataFrame indexed by date"""
+        return pd.DataFrame({name: getattr(self, name) for name in self.COLUMNS[1:]},
+                            index=pd.DatetimeIndex(self.dates, name='date'))
+
+
+def compute_metrics(history):
+    """Summary statistics of a history, as a dict of floats
+
+    Raises ValueError for an empty history. With a single bar there are no
+    returns, so total_return, volatility and max_drawdown are NaN;
+    volatility is also NaN with only one return.
+    """
+    if not len(history):
+        raise ValueError("No price history")
+    close = history.close
+    returns = np.diff(close) / close[:-1]
+    return {
+        'avg_price': close.mean(),
+        'max_price': close.max(),
+        'min_price': close.min(),
+        'avg_volume': history.volume.mean(),
+        'total_return': close[-1] / close[0] - 1 if len(close) > 1 else np.nan,
+        # Annualized standard deviation of daily returns
+        'volatility': returns.std() * np.sqrt(TRADING_DAYS) if len(returns) > 1 else np.nan,
+        'max_drawdown': (1 - close / np.maximum.accumulate(close)).max() if len(close) > 1 else np.nan,
+    }
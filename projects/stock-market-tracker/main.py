@@ -1,119 +1,208 @@
 import requests
-import json
-import csv
 import os
-from datetime import datetime, timedelta
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
 import matplotlib.pyplot as plt
 import pandas as pd
-import numpy as np
+from requests.adapters import HTTPAdapter
+
+from cache_store import CacheStore, migrate_json_cache
+from history import PriceHistory, compute_metrics
+from rate_limit import TokenBucket
+
+# Alpha Vantage free tier quota; paid plans allow more
+REQUESTS_PER_MINUTE = 5
+# Requests that may be sent back to back before the limiter spaces them out
+RATE_LIMIT_BURST = 5
+
+# Concurrent requests when fetching many symbols
+MAX_WORKERS = 8
+REQUEST_TIMEOUT = 30
+
+# Retries after a failed request, waiting RETRY_BACKOFF, 2x, 4x... seconds
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1.0
+
+# Seconds each kind of cache entry stays fresh
+CACHE_TTLS = {
+    'quote': 5 * 60,
+    'historical_compact': 60 * 60,
+    'historical_full': 60 * 60,
+}
 
 class StockTracker:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, base_url=None, requests_per_minute=REQUESTS_PER_MINUTE,
+                 max_workers=MAX_WORKERS):
         self.api_key = api_key or "demo"  # Use demo key by default
-        self.base_url = "https://www.alphavantage.co/query"
-        self.cache_file = "stock_cache.json"
+        # base_url can point at a stand-in server (see fake_api.py)
+        self.base_url = base_url or "https://www.alphavantage.co/query"
+        self.cache_file = "stock_cache.db"
+        self.max_workers = max_workers
+        self.rate_limiter = TokenBucket(requests_per_minute / 60, RATE_LIMIT_BURST)
+        
+        # One pooled session, so requests reuse connections
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_maxsize=max_workers))
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=max_workers))
+        
         self.load_cache()
     
     def load_cache(self):
-        """Load cached stock data"""
-        try:
-            if os.path.exists(self.cache_file):
-                with open(self.cache_file, 'r') as f:
-                    self.cache = json.load(f)
-            else:
-                self.cache = {}
-        except:
-            self.cache = {}
+        """Open the cache; entries are read when they are needed"""
+        self.cache = CacheStore(self.cache_file)
+        # Carry over the cache of older versions
+        imported = migrate_json_cache(self.cache, "stock_cache.json", CACHE_TTLS)
+        if imported:
+            print(f"Imported {imported} entries from stock_cache.json")
+        self.cache.purge_expired()
     
-    def save_cache(self):
-        """Save stock data to cache"""
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.cache, f, indent=2)
+    def get_cached(self, symbol, cache_key):
+        """Get cached data unless it has expired"""
+        if not cache_key.startswith('historical_'):
+            return self.cache.get(symbol, cache_key)
+        
+        data = self.cache.get_blob(symbol, cache_key)
+        if data is not None:
+            return PriceHistory.from_bytes(data)
+        # Histories cached as JSON by earlier versions, until they expire
+        series = self.cache.get(symbol, cache_key)
+        return PriceHistory.from_api(series) if series else None
+    
+    def set_cached(self, symbol, cache_key, data):
+        """Cache data for a symbol; histories are stored as .npz"""
+        if isinstance(data, PriceHistory):
+            self.cache.put_blob(symbol, cache_key, data.to_bytes(), CACHE_TTLS[cache_key])
+        else:
+            self.cache.put(symbol, cache_key, data, CACHE_TTLS[cache_key])
+    
+    def fetch(self, params, result_key):
+        """Call the API and return (data, error)
+        
+        Every request waits for the rate limiter. Network errors, 5xx and
+        429 responses and the API's per-minute rate limit notes are retried
+        with exponential backoff; other errors (such as an unknown symbol or
+        an 'Information' message about the daily quota) are returned right
+        away.
+        """
+        params = dict(params, apikey=self.api_key)
+        error = None
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                # Jitter keeps the threads from retrying in lockstep
+                time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.get(self.base_url, params=params, timeout=REQUEST_TIMEOUT)
+                if response.status_code == 429 or response.status_code >= 500:
+                    error = f"HTTP {response.status_code}"
+                    continue
+                response.raise_for_status()
+                data = response.json()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                error = str(e)
+                continue
+            
+            if result_key in data:
+                return data[result_key], None
+            if 'Note' in data:
+                # Over the per-minute quota: worth another try after a pause
+                error = data['Note']
+                continue
+            # 'Information' covers the daily limit, premium-only endpoints and
+            # bad keys, none of which a retry within seconds would fix
+            return None, data.get('Error Message') or data.get('Information', 'Unknown error')
+        return None, error
     
     def get_stock_quote(self, symbol):
         """Get current stock quote"""
-        if symbol in self.cache and 'quote' in self.cache[symbol]:
-            cached_data = self.cache[symbol]['quote']
-            # Check if cache is recent (less than 5 minutes old)
-            cache_time = datetime.fromisoformat(cached_data['cache_time'])
-            if datetime.now() - cache_time < timedelta(minutes=5):
-                return cached_data['data']
+        # Quotes are cached for 5 minutes
+        cached_data = self.get_cached(symbol, 'quote')
+        if cached_data is not None:
+            return cached_data
+        
+        quote_data, error = self.fetch_quote(symbol)
+        if quote_data is None:
+            print(f"Error fetching stock quote: {error}")
+            return None
         
+        self.set_cached(symbol, 'quote', quote_data)
+        return quote_data
+    
+    def fetch_quote(self, symbol):
         params = {
             'function': 'GLOBAL_QUOTE',
-            'symbol': symbol,
-            'apikey': self.api_key
+            'symbol': symbol
         }
-        
-        try:
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'Global Quote' in data:
-                quote_data = data['Global Quote']
-                cached_quote = {
-                    'data': quote_data,
-                    'cache_time': datetime.now().isoformat()
-                }
-                
-                if symbol not in self.cache:
-                    self.cache[symbol] = {}
-                self.cache[symbol]['quote'] = cached_quote
-                self.save_cache()
-                
-                return quote_data
-            else:
-                print(f"Error: {data.get('Note', 'Unknown error')}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching stock quote: {e}")
-            return None
+        return self.fetch(params, 'Global Quote')
     
     def get_historical_data(self, symbol, output_size='compact'):
-        """Get historical stock data"""
+        """Get historical stock data as a PriceHistory"""
         cache_key = f"historical_{output_size}"
         
-        if symbol in self.cache and cache_key in self.cache[symbol]:
-            cached_data = self.cache[symbol][cache_key]
-            # Check if cache is recent (less than 1 hour old)
-            cache_time = datetime.fromisoformat(cached_data['cache_time'])
-            if datetime.now() - cache_time < timedelta(hours=1):
-                return cached_data['data']
+        # Historical data is cached for 1 hour
+        cached_data = self.get_cached(symbol, cache_key)
+        if cached_data is not None:
+            return cached_data
+        
+        historical_data, error = self.fetch_history(symbol, output_size)
+        if historical_data is None:
+            print(f"Error fetching historical data: {error}")
+            return None
         
+        self.set_cached(symbol, cache_key, historical_data)
+        return historical_data
+    
+    def fetch_history(self, symbol, output_size='compact'):
+        """Fetch daily bars and parse them into a PriceHistory"""
         params = {
             'function': 'TIME_SERIES_DAILY',
             'symbol': symbol,
-            'outputsize': output_size,
-            'apikey': self.api_key
+            'outputsize': output_size
         }
-        
+        series, error = self.fetch(params, 'Time Series (Daily)')
+        if series is None:
+            return None, error
+        if not series:
+            return None, "No data"
         try:
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'Time Series (Daily)' in data:
-                historical_data = data['Time Series (Daily)']
-                cached_historical = {
-                    'data': historical_data,
-                    'cache_time': datetime.now().isoformat()
-                }
-                
-                if symbol not in self.cache:
-                    self.cache[symbol] = {}
-                self.cache[symbol][cache_key] = cached_historical
-                self.save_cache()
-                
-                return historical_data
-            else:
-                print(f"Error: {data.get('Note', 'Unknown error')}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching historical data: {e}")
-            return None
+            return PriceHistory.from_api(series), None
+        except (ValueError, KeyError) as e:
+            return None, f"Unexpected data: {e}"
+    
+    def get_quotes(self, symbols):
+        """Get quotes for many symbols at once
+        
+        Returns a dict of symbol -> quote, with None for symbols that could
+        not be fetched; the other symbols are still returned.
+        """
+        return self.fetch_many(symbols, 'quote', self.fetch_quote)
+    
+    def get_histories(self, symbols, output_size='compact'):
+        """Get historical data for many symbols at once, like get_quotes"""
+        return self.fetch_many(symbols, f"historical_{output_size}",
+                               lambda symbol: self.fetch_history(symbol, output_size))
+    
+    def fetch_many(self, symbols, cache_key, fetch_one):
+        """Fetch uncached symbols concurrently and cache them"""
+        results = {}
+        missing = []
+        for symbol in dict.fromkeys(symbols):
+            results[symbol] = self.get_cached(symbol, cache_key)
+            if results[symbol] is None:
+                missing.append(symbol)
+        if not missing:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for symbol, (data, error) in zip(missing, executor.map(fetch_one, missing)):
+                if data is None:
+                    print(f"Error fetching {symbol}: {error}")
+                    continue
+                results[symbol] = data
+                # Each result is stored as it arrives, so a failure later on loses nothing
+                self.set_cached(symbol, cache_key, data)
+        return results
     
     def display_quote(self, symbol):
         """Display current stock quote"""
@@ -130,33 +219,21 @@ class StockTracker:
     
     def display_historical_summary(self, symbol):
         """Display historical data summary"""
-        data = self.get_historical_data(symbol, 'compact')
-        if data:
-            dates = sorted(data.keys(), reverse=True)[:10]  # Last 10 days
+        history = self.get_historical_data(symbol, 'compact')
+        if history:
+            recent = history.last(10)  # Last 10 days
             print(f"\n=== {symbol} Recent Prices ===")
-            for date in dates:
-                daily_data = data[date]
-                print(f"{date}: ${float(daily_data['4. close']):.2f}")
+            for date, close in zip(recent.dates[::-1], recent.close[::-1]):
+                print(f"{date}: ${close:.2f}")
     
     def plot_stock_chart(self, symbol, days=30):
         """Plot stock price chart"""
-        data = self.get_historical_data(symbol, 'compact')
-        if data:
-            dates = []
-            prices = []
-            
-            for date, daily_data in sorted(data.items()):
-                if len(dates) >= days:
-                    break
-                dates.append(date)
-                prices.append(float(daily_data['4. close']))
-            
-            # Reverse to show chronological order
-            dates.reverse()
-            prices.reverse()
+        history = self.get_historical_data(symbol, 'compact')
+        if history:
+            recent = history.last(days)
             
             plt.figure(figsize=(12, 6))
-            plt.plot(dates, prices, marker='o', linestyle='-')
+            plt.plot(recent.dates, recent.close, marker='o', linestyle='-')
             plt.title(f'{symbol} Stock Price - Last {days} Days')
             plt.xlabel('Date')
             plt.ylabel('Price ($)')
@@ -169,44 +246,41 @@ class StockTracker:
     
     def calculate_metrics(self, symbol):
         """Calculate basic financial metrics"""
-        data = self.get_historical_data(symbol, 'compact')
-        if data:
-            closes = [float(daily_data['4. close']) for daily_data in data.values()]
-            volumes = [int(daily_data['5. volume']) for daily_data in data.values()]
-            
-            # Basic statistics
-            avg_price = np.mean(closes)
-            max_price = max(closes)
-            min_price = min(closes)
-            avg_volume = np.mean(volumes)
+        history = self.get_historical_data(symbol, 'compact')
+        if history:
+            metrics = compute_metrics(history)
             
             print(f"\n=== {symbol} Metrics ===")
-            print(f"Average Price: ${avg_price:.2f}")
-            print(f"Max Price: ${max_price:.2f}")
-            print(f"Min Price: ${min_price:.2f}")
-            print(f"Average Volume: {avg_volume:,.0f}")
+            print(f"Average Price: ${metrics['avg_price']:.2f}")
+            print(f"Max Price: ${metrics['max_price']:.2f}")
+            print(f"Min Price: ${metrics['min_price']:.2f}")
+            print(f"Average Volume: {metrics['avg_volume']:,.0f}")
+            print(f"Return: {metrics['total_return'] * 100:.2f}%")
+            print(f"Volatility (annualized): {metrics['volatility'] * 100:.2f}%")
+            print(f"Max Drawdown: {metrics['max_drawdown'] * 100:.2f}%")
+            return metrics
+    
+    def calculate_metrics_many(self, symbols, output_size='compact'):
+        """Metrics for many symbols as a DataFrame, one row per symbol
+        
+        Symbols whose history could not be fetched are left out.
+        """
+        histories = self.get_histories(symbols, output_size)
+        rows = {symbol: compute_metrics(history) for symbol, history in histories.items() if history}
+        return pd.DataFrame.from_dict(rows, orient='index')
     
     def export_to_csv(self, symbol, filename=None):
         """Export historical data to CSV"""
-        data = self.get_historical_data(symbol, 'full')
-        if data:
+        history = self.get_historical_data(symbol, 'full')
+        if history:
             if not filename:
                 filename = f"{symbol}_historical_data.csv"
             
-            with open(filename, 'w', newline='') as csvfile:
-                fieldnames = ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                
-                writer.writeheader()
-                for date, daily_data in sorted(data.items(), reverse=True):
-                    writer.writerow({
-                        'Date': date,
-                        'Open': daily_data['1. open'],
-                        'High': daily_data['2. high'],
-                        'Low': daily_data['3. low'],
-                        'Close': daily_data['4. close'],
-                        'Volume': daily_data['5. volume']
-                    })
+            # Newest first, as before
+            frame = history.to_frame().iloc[::-1]
+            frame.index = frame.index.strftime('%Y-%m-%d')
+            frame.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+            frame.to_csv(filename, index_label='Date')
             
             print(f"Data exported to {filename}")
         else:
@@ -224,7 +298,9 @@ def main():
         print("Get a free API key from: https://www.alphavantage.co/support/#api-key")
         api_key = "demo"
     
-    tracker = StockTracker(api_key)
+    # Paid plans allow more requests per minute
+    requests_per_minute = float(os.environ.get('ALPHAVANTAGE_REQUESTS_PER_MINUTE', REQUESTS_PER_MINUTE))
+    tracker = StockTracker(api_key, os.environ.get('ALPHAVANTAGE_BASE_URL'), requests_per_minute)
     
     while True:
         print("\nOptions:")
@@ -233,9 +309,11 @@ def main():
         print("3. Plot stock chart")
         print("4. Calculate metrics")
         print("5. Export to CSV")
-        print("6. Exit")
+        print("6. Refresh watchlist")
+        print("7. Compare metrics")
+        print("8. Exit")
         
-        choice = input("\nEnter your choice (1-6): ").strip()
+        choice = input("\nEnter your choice (1-8): ").strip()
         
         if choice == "1":
             symbol = input("Enter stock symbol (e.g., AAPL, MSFT, GOOGL): ").upper()
@@ -263,6 +341,25 @@ def main():
             tracker.export_to_csv(symbol, filename or None)
         
         elif choice == "6":
+            symbols = input("Enter symbols separated by commas: ").upper().replace(' ', '').split(',')
+            quotes = tracker.get_quotes([symbol for symbol in symbols if symbol])
+            print(f"\n{'Symbol':8} {'Price':>10} {'Change %':>9}")
+            for symbol, quote in quotes.items():
+                if quote:
+                    print(f"{symbol:8} {float(quote['05. price']):>10.2f} "
+                          f"{float(quote['10. change percent'].rstrip('%')):>8.2f}%")
+                else:
+                    print(f"{symbol:8} {'unavailable':>10}")
+        
+        elif choice == "7":
+            symbols = input("Enter symbols separated by commas: ").upper().replace(' ', '').split(',')
+            metrics = tracker.calculate_metrics_many([symbol for symbol in symbols if symbol])
+            if metrics.empty:
+                print("No data")
+            else:
+                print(metrics.sort_values('total_return', ascending=False).to_string(float_format='{:.4f}'.format))
+        
+        elif choice == "8":
             print("Goodbye!")
             break
         
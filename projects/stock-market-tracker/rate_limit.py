@@ -0,0 +1,30 @@
+"""Token bucket rate limiter shared by the threads fetching from the API."""
+import threading
+import time
+
+
+class TokenBucket:
+    """Allows rate requests per second on average, in bursts of up to capacity
+
+    acquire() blocks until a token is available, so any number of threads
+    can share one bucket and together stay within the API quota.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
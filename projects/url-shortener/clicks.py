@@ -0,0 +1,207 @@
+"""Buffered click recording for URLShortener.
+
+record() only puts the click on an in-process queue; a background thread
+writes queued clicks in batches, one transaction every flush_interval
+seconds or batch_size clicks, whichever comes first. Within a batch the
+per-link counter updates are coalesced into one UPDATE per short code, and
+the same transaction adds the batch to the per-minute, per-hour and per-day
+rollups and the daily referrer and user agent counts.
+
+The queue is bounded. When it is full, the 'drop' policy discards the
+click and counts it, so a slow disk never slows redirects down; the
+'block' policy makes record() wait for room instead.
+
+With sharded storage there is one recorder, and so one writer thread, per
+shard (ShardedClickRecorder).
+"""
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+# Queue item telling the writer thread to stop
+_STOP = object()
+
+# Rollup granularities and the strftime format of their bucket labels
+BUCKET_FORMATS = {
+    'minute': '%Y-%m-%d %H:%M',
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+}
+
+
+class ClickRecorder:
+    """Queues clicks and writes them to the database in batches"""
+
+    def __init__(self, db_name, flush_interval=0.1, batch_size=1000, max_queue=100_000, policy='drop'):
+        if policy not in ('drop', 'block'):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.db_name = db_name
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.policy = policy
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+        self._pid = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Threads don't survive fork: a child process starts its own writer
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self.max_queue)
+                self._thread = threading.Thread(target=self._run, name='click-writer', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def record(self, short_code, ip_address=None, user_agent=None, referrer=None):
+        """Queue a click; returns False if it was dropped"""
+        self._ensure_started()
+        click = (short_code, time.time(), ip_address, user_agent, referrer)
+        try:
+            if self.policy == 'block':
+                self._queue.put(click)
+            else:
+                self._queue.put_nowait(click)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.recorded += 1
+        return True
+
+    def flush(self):
+        """Wait until every queued click has been written"""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Write the remaining clicks and stop the writer thread"""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def stats(self):
+        return {
+            'recorded': self.recorded,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+            'queued': self._queue.qsize() if self._pid == os.getpid() else 0,
+        }
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_name, timeout=30)
+        conn.execute('PRAGMA synchronous = NORMAL')
+        stopping = False
+        try:
+            while not stopping:
+                batch = []
+                first = self._queue.get()
+                if first is _STOP:
+                    self._queue.task_done()
+                    break
+                batch.append(first)
+
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    try:
+                        click = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if click is _STOP:
+                        stopping = True
+                        self._queue.task_done()
+                        break
+                    batch.append(click)
+
+                self._write(conn, batch)
+                for _ in batch:
+                    self._queue.task_done()
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        """Write one batch of clicks and its rollups in a single transaction"""
+        rows = []
+        counts = Counter()
+        buckets = Counter()
+        sources = Counter()
+        for short_code, clicked_at, ip_address, user_agent, referrer in batch:
+            clicked = time.gmtime(clicked_at)
+            rows.append((short_code, time.strftime('%Y-%m-%d %H:%M:%S', clicked),
+                         ip_address, user_agent, referrer))
+            counts[short_code] += 1
+            for granularity, bucket_format in BUCKET_FORMATS.items():
+                buckets[short_code, granularity, time.strftime(bucket_format, clicked)] += 1
+            day = time.strftime(BUCKET_FORMATS['day'], clicked)
+            if referrer:
+                sources[short_code, day, 'referrer', referrer] += 1
+            if user_agent:
+                sources[short_code, day, 'user_agent', user_agent] += 1
+
+        try:
+            with conn:
+                conn.executemany('''INSERT INTO analytics (short_code, click_time, ip_address, user_agent, referrer)
+                                    VALUES (?, ?, ?, ?, ?)''', rows)
+                conn.executemany('UPDATE urls SET clicks = clicks + ? WHERE short_code = ?',
+                                 [(count, short_code) for short_code, count in counts.items()])
+                conn.executemany('''INSERT INTO click_rollups (short_code, granularity, bucket, clicks)
+                                    VALUES (?, ?, ?, ?)
+                                    ON CONFLICT (short_code, granularity, bucket) DO UPDATE SET clicks = clicks + excluded.clicks''',
+                                 [key + (count,) for key, count in buckets.items()])
+                conn.executemany('''INSERT INTO click_sources (short_code, day, kind, value, clicks)
+                                    VALUES (?, ?, ?, ?, ?)
+                                    ON CONFLICT (short_code, kind, day, value) DO UPDATE SET clicks = clicks + excluded.clicks''',
+                                 [key + (count,) for key, count in sources.items()])
+        except sqlite3.Error as e:
+            self.failed += len(batch)
+            print(f"Error recording clicks: {e}")
+            return
+        self.written += len(batch)
+        self.batches += 1
+
+
+class ShardedClickRecorder:
+    """Sends each click to the recorder of its short code's shard
+
+    Every shard has its own queue and writer thread, so a busy shard
+    doesn't hold up clicks for the others.
+    """
+
+    def __init__(self, recorders, shard_index):
+        self.recorders = recorders
+        self.shard_index = shard_index
+
+    def record(self, short_code, ip_address=None, user_agent=None, referrer=None):
+        recorder = self.recorders[self.shard_index(short_code)]
+        return recorder.record(short_code, ip_address, user_agent, referrer)
+
+    def flush(self):
+        for recorder in self.recorders:
+            recorder.flush()
+
+    def close(self):
+        for recorder in self.recorders:
+            recorder.close()
+
+    def stats(self):
+        totals = Counter()
+        for recorder in self.recorders:
+            totals.update(recorder.stats())
+        return dict(totals)
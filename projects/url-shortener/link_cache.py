@@ -0,0 +1,189 @@
+"""In-memory cache of short code -> original URL for the redirect path.
+
+Redirect traffic is heavily skewed, so the cache uses TinyLFU admission: a
+compact count-min sketch estimates how often each code is requested, and a
+new code only displaces a cached one when it has been requested more often
+than the entry it would evict. One-off lookups (crawlers, typos, scans)
+therefore cannot flush the hot links out.
+
+Entries to evict are chosen CLOCK-style: the oldest few entries are
+examined, the least used one is the eviction candidate, and the others have
+their hit counts halved and move to the back of the line.
+
+Unknown codes are cached as well (negative caching) for a short time, so
+repeated requests for a missing code don't each reach the database.
+
+Hits take no lock; the metrics are plain counters and may undercount
+slightly under heavy multi-threaded use.
+"""
+import itertools
+import random
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by get() when the cache knows nothing about a code
+MISS = object()
+
+# Entries examined when choosing one to evict
+EVICTION_SAMPLE = 8
+
+
+class FrequencySketch:
+    """A count-min sketch of request frequencies with periodic aging"""
+
+    DEPTH = 4
+
+    def __init__(self, capacity):
+        width = 1
+        while width < capacity:
+            width *= 2
+        self.mask = width - 1
+        self.rows = [[0] * width for _ in range(self.DEPTH)]
+        self.seeds = [random.getrandbits(64) for _ in range(self.DEPTH)]
+        # Halve every counter after this many increments, so old popularity fades
+        self.sample_size = 10 * width
+        self.additions = 0
+
+    def _indexes(self, key):
+        key_hash = hash(key)
+        return [hash((key_hash, seed)) & self.mask for seed in self.seeds]
+
+    def increment(self, key):
+        for row, index in zip(self.rows, self._indexes(key)):
+            if row[index] < 255:
+                row[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.reset()
+
+    def frequency(self, key):
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+    def reset(self):
+        self.rows = [[count >> 1 for count in row] for row in self.rows]
+        self.additions //= 2
+
+
+class LinkCache:
+    """A bounded short code -> URL cache with TinyLFU admission
+
+    Entries expire after ttl seconds (None keeps them until evicted or
+    invalidated), which bounds how long another process's deletion can go
+    unnoticed. Unknown codes are remembered for negative_ttl seconds.
+    """
+
+    def __init__(self, capacity=100_000, ttl=300.0, negative_ttl=30.0, negative_capacity=None):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.negative_capacity = negative_capacity or max(capacity // 10, 1)
+        # code -> [url, expires_at, hits]
+        self._entries = {}
+        # code -> expires_at, oldest first
+        self._negative = OrderedDict()
+        self._sketch = FrequencySketch(capacity)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.evictions = 0
+
+    def get(self, short_code):
+        """Get the cached URL, None for a known-missing code, or MISS"""
+        entry = self._entries.get(short_code)
+        if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+            entry[2] += 1
+            self.hits += 1
+            return entry[0]
+
+        expires_at = self._negative.get(short_code)
+        if expires_at is not None and expires_at > time.monotonic():
+            self.negative_hits += 1
+            return None
+
+        self.misses += 1
+        with self._lock:
+            self._sketch.increment(short_code)
+        return MISS
+
+    def put(self, short_code, url):
+        """Cache a lookup result; url None records the code as missing"""
+        now = time.monotonic()
+        with self._lock:
+            if url is None:
+                self._negative[short_code] = now + self.negative_ttl
+                self._negative.move_to_end(short_code)
+                if len(self._negative) > self.negative_capacity:
+                    self._negative.popitem(last=False)
+                return
+
+            self._negative.pop(short_code, None)
+            expires_at = now + self.ttl if self.ttl is not None else None
+            entry = self._entries.get(short_code)
+            if entry is not None:
+                entry[0], entry[1] = url, expires_at
+                return
+
+            if len(self._entries) >= self.capacity:
+                victim = self._choose_victim()
+                # Admit only codes requested more often than the victim. Hits
+                # skip the sketch to stay cheap, so count the victim's separately.
+                victim_frequency = self._sketch.frequency(victim) + self._entries[victim][2]
+                if self._sketch.frequency(short_code) <= victim_frequency:
+                    self.rejected += 1
+                    return
+                del self._entries[victim]
+                self.evictions += 1
+
+            self._entries[short_code] = [url, expires_at, 0]
+            self.admitted += 1
+
+    def _choose_victim(self):
+        """Pick the least used of the oldest entries, or an expired one"""
+        now = time.monotonic()
+        sample = list(itertools.islice(self._entries, EVICTION_SAMPLE))
+        victim = None
+        for key in sample:
+            expires_at = self._entries[key][1]
+            if expires_at is not None and expires_at <= now:
+                victim = key
+                break
+        if victim is None:
+            victim = min(sample, key=lambda key: self._entries[key][2])
+
+        # Survivors age and go to the back, so every entry is examined in turn
+        for key in sample:
+            if key != victim:
+                entry = self._entries.pop(key)
+                entry[2] >>= 1
+                self._entries[key] = entry
+        return victim
+
+    def invalidate(self, short_code):
+        """Forget a code, e.g. after it is created or deleted"""
+        with self._lock:
+            self._entries.pop(short_code, None)
+            self._negative.pop(short_code, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._negative.clear()
+
+    def stats(self):
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'negative_size': len(self._negative),
+            'hits': self.hits,
+            'negative_hits': self.negative_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,124 @@
+"""Load test for the redirect server.
+
+Opens a number of keep-alive connections and sends GET requests for short
+codes drawn from a Zipf-like distribution (a few links get most of the
+traffic), then reports throughput and latency percentiles. Start the
+server first, then e.g.:
+
+    python loadtest.py --seed 100000              # create sample links in url_shortener.db
+    python server.py --workers 4 &
+    python loadtest.py --connections 200 --duration 20
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from main import URLShortener
+from storage import open_storage
+
+
+def seed(db_name, count, shards=1):
+    """Create sample links through the shortener"""
+    shortener = URLShortener(db_name, cache_size=0, shards=shards)
+    shortener.shorten_many([f'https://example.com/articles/{i}' for i in range(count)])
+    print(f"Created {count} links in {db_name}")
+
+
+def load_codes(db_name, limit, shards=1):
+    storage = open_storage(db_name, shards)
+    codes = []
+    for index in range(storage.shard_count):
+        conn = storage.connect_shard(index)
+        codes.extend(conn.execute('SELECT id, short_code FROM urls ORDER BY id LIMIT ?', (limit,)))
+        conn.close()
+    return [code for _, code in sorted(codes)[:limit]]
+
+
+async def client(host, port, paths, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            path = next(paths)
+            started = time.perf_counter()
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: loadtest\r\n\r\n'.encode())
+            head = await reader.readuntil(b'\r\n\r\n')
+            status = int(head[9:12])
+            length = 0
+            for line in head.split(b'\r\n'):
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            if length:
+                await reader.readexactly(length)
+            if status >= 400:
+                errors.append(status)
+            else:
+                latencies.append(time.perf_counter() - started)
+    except (OSError, asyncio.IncompleteReadError) as e:
+        errors.append(str(e))
+    finally:
+        writer.close()
+
+
+def request_paths(codes, skew):
+    """Yield request paths forever, most of them for the first few codes"""
+    weights = [1 / (rank + 1) ** skew for rank in range(len(codes))]
+    while True:
+        for code in random.choices(codes, weights, k=10000):
+            yield '/' + code
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run(host, port, codes, connections, duration, skew):
+    latencies = []
+    errors = []
+    paths = request_paths(codes, skew)
+    deadline = time.perf_counter() + duration
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(host, port, paths, deadline, latencies, errors)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Server:      http://{host}:{port}/ ({len(codes)} codes)")
+    print(f"Connections: {connections}")
+    print(f"Requests:    {len(latencies)} ok, {len(errors)} errors in {elapsed:.1f}s")
+    print(f"Throughput:  {len(latencies) / elapsed:.1f} requests/s")
+    print(f"Latency:     p50 {percentile(latencies, 0.50) * 1000:.2f} ms, "
+          f"p90 {percentile(latencies, 0.90) * 1000:.2f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms, "
+          f"max {percentile(latencies, 1.0) * 1000:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the redirect server')
+    parser.add_argument('--host', default='127.0.0.1', help='server address')
+    parser.add_argument('--port', type=int, default=8080, help='server port')
+    parser.add_argument('--connections', type=int, default=100, help='concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=10, help='test length in seconds')
+    parser.add_argument('--codes', type=int, default=100000, help='distinct codes to request')
+    parser.add_argument('--skew', type=float, default=1.0, help='Zipf exponent; 0 requests codes uniformly')
+    parser.add_argument('--seed', type=int, metavar='N', help='create N sample links and exit')
+    parser.add_argument('--db', default='url_shortener.db', help='shortener database')
+    parser.add_argument('--shards', type=int, default=1, help='database shards')
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.db, args.seed, args.shards)
+        return
+
+    codes = load_codes(args.db, args.codes, args.shards)
+    if not codes:
+        parser.error(f"no links in {args.db}; create some with --seed")
+    asyncio.run(run(args.host, args.port, codes, args.connections, args.duration, args.skew))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,267 @@
-import sqlite3
 import hashlib
+import os
+import secrets
+import sqlite3
 import string
-import random
+import threading
+from multiprocessing import Pool
 from urllib.parse import urlparse
 import validators
 
+from clicks import BUCKET_FORMATS
+from link_cache import LinkCache, MISS
+from storage import open_storage
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# Each entry is a list of statements; never edit an entry once released,
+# append a new one instead.
+MIGRATIONS = [
+    # 1: ID sequence that processes reserve blocks of short code IDs from,
+    # starting after every ID AUTOINCREMENT has handed out
+    ["""CREATE TABLE IF NOT EXISTS sequences
+        (name TEXT PRIMARY KEY,
+         next_id INTEGER NOT NULL)""",
+     """INSERT OR IGNORE INTO sequences (name, next_id)
+        SELECT 'urls', MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'urls'), 0),
+                           COALESCE((SELECT MAX(id) FROM urls), 0)) + 1"""],
+    # 2: click rollups maintained by the click writer, backfilled from the
+    # raw click log, and indexes for per-link and retention queries on it
+    ["""CREATE TABLE IF NOT EXISTS click_rollups
+        (short_code TEXT NOT NULL,
+         granularity TEXT NOT NULL,
+         bucket TEXT NOT NULL,
+         clicks INTEGER NOT NULL,
+         PRIMARY KEY (short_code, granularity, bucket)) WITHOUT ROWID""",
+     """CREATE TABLE IF NOT EXISTS click_sources
+        (short_code TEXT NOT NULL,
+         day TEXT NOT NULL,
+         kind TEXT NOT NULL,
+         value TEXT NOT NULL,
+         clicks INTEGER NOT NULL,
+         PRIMARY KEY (short_code, kind, day, value)) WITHOUT ROWID""",
+     """INSERT INTO click_rollups (short_code, granularity, bucket, clicks)
+        SELECT short_code, 'minute', strftime('%Y-%m-%d %H:%M', click_time), COUNT(*)
+        FROM analytics GROUP BY 1, 3""",
+     """INSERT INTO click_rollups (short_code, granularity, bucket, clicks)
+        SELECT short_code, 'hour', strftime('%Y-%m-%d %H:00', click_time), COUNT(*)
+        FROM analytics GROUP BY 1, 3""",
+     """INSERT INTO click_rollups (short_code, granularity, bucket, clicks)
+        SELECT short_code, 'day', strftime('%Y-%m-%d', click_time), COUNT(*)
+        FROM analytics GROUP BY 1, 3""",
+     """INSERT INTO click_sources (short_code, day, kind, value, clicks)
+        SELECT short_code, date(click_time), 'referrer', referrer, COUNT(*)
+        FROM analytics WHERE referrer != '' GROUP BY 1, 2, 4""",
+     """INSERT INTO click_sources (short_code, day, kind, value, clicks)
+        SELECT short_code, date(click_time), 'user_agent', user_agent, COUNT(*)
+        FROM analytics WHERE user_agent != '' GROUP BY 1, 2, 4""",
+     'CREATE INDEX IF NOT EXISTS idx_analytics_code_time ON analytics (short_code, click_time)',
+     'CREATE INDEX IF NOT EXISTS idx_analytics_time ON analytics (click_time)'],
+    # 3: look links up by destination, so bulk shortening can reuse codes.
+    # Not unique: shorten_url still creates a new code on every call.
+    ['CREATE INDEX IF NOT EXISTS idx_urls_original_url ON urls (original_url)'],
+    # 4: per-file settings, such as the shard position of a sharded database
+    ["""CREATE TABLE IF NOT EXISTS meta
+        (name TEXT PRIMARY KEY,
+         value TEXT NOT NULL)"""],
+    # 5: find expired rollups by age, so retention deletes them in batches
+    ['CREATE INDEX IF NOT EXISTS idx_click_rollups_age ON click_rollups (granularity, bucket)'],
+]
+
+BASE62_ALPHABET = string.digits + string.ascii_letters
+
+# Generated codes have CODE_LENGTH characters while IDs fit in KEYSPACE, then
+# grow by a character, so the two ranges never produce the same code
+CODE_LENGTH = 6
+KEYSPACE = len(BASE62_ALPHABET) ** CODE_LENGTH
+
+# IDs below KEYSPACE are scrambled by a keyed permutation (see CodePermutation)
+# that works on the two halves of a code, CODE_LENGTH // 2 digits each
+CODE_HALF = len(BASE62_ALPHABET) ** (CODE_LENGTH // 2)
+PERMUTATION_ROUNDS = 8
+
+# Overrides the permutation secret stored in the database
+CODE_SECRET_ENV = 'URL_SHORTENER_CODE_SECRET'
+
+# IDs each process reserves from the database at a time
+ID_BLOCK_SIZE = 1000
+
+# URLs per query when looking up existing links in bulk, well under
+# SQLite's limit on bound parameters
+LOOKUP_CHUNK_SIZE = 500
+
+# URLs each worker process validates at a time in bulk shortening
+VALIDATION_CHUNK_SIZE = 5000
+
+# Short codes kept in each process's redirect cache
+LINK_CACHE_SIZE = 100_000
+
+# Default retention, in days, of raw clicks and of the finer rollups;
+# day rollups are kept forever
+RAW_CLICK_RETENTION_DAYS = 30
+MINUTE_ROLLUP_RETENTION_DAYS = 7
+HOUR_ROLLUP_RETENTION_DAYS = 90
+
+# Rows deleted per transaction while compacting, so clicks keep flowing
+COMPACT_BATCH_SIZE = 10000
+
+
+def validate_urls(urls):
+    """Validate a list of URLs, returning a list of booleans"""
+    return [bool(validators.url(url)) for url in urls]
+
+
+def to_base62(number):
+    digits = []
+    while True:
+        number, remainder = divmod(number, 62)
+        digits.append(BASE62_ALPHABET[remainder])
+        if not number:
+            return ''.join(reversed(digits))
+
+
+def from_base62(code):
+    number = 0
+    for char in code:
+        number = number * 62 + BASE62_ALPHABET.index(char)
+    return number
+
+
+class CodePermutation:
+    """A secret-keyed bijection on the IDs below KEYSPACE
+    
+    A Feistel network over the two halves of the number, each below
+    CODE_HALF, with keyed BLAKE2b as the round function. Without the secret,
+    neither the source nor any number of observed codes tells which ID a
+    code stands for or what the next code will be.
+    """
+    
+    def __init__(self, secret):
+        key = hashlib.blake2b(secret.encode('utf-8'), digest_size=32).digest()
+        self._hash = hashlib.blake2b(key=key, digest_size=8)
+    
+    def _round(self, index, half):
+        # Copying the keyed state skips rehashing the key every round
+        h = self._hash.copy()
+        h.update(bytes((index,)) + half.to_bytes(4, 'little'))
+        return int.from_bytes(h.digest(), 'little') % CODE_HALF
+    
+    def permute(self, number):
+        left, right = divmod(number, CODE_HALF)
+        for index in range(PERMUTATION_ROUNDS):
+            left, right = right, (left + self._round(index, right)) % CODE_HALF
+        return left * CODE_HALF + right
+    
+    def unpermute(self, number):
+        left, right = divmod(number, CODE_HALF)
+        for index in reversed(range(PERMUTATION_ROUNDS)):
+            left, right = (right - self._round(index, left)) % CODE_HALF, left
+        return left * CODE_HALF + right
+
+
+def encode_id(url_id, permutation=None):
+    """Turn a URL ID into its short code, scrambled by permutation if given"""
+    if url_id >= KEYSPACE:
+        return to_base62(url_id)
+    if permutation:
+        url_id = permutation.permute(url_id)
+    return to_base62(url_id).rjust(CODE_LENGTH, BASE62_ALPHABET[0])
+
+
+def decode_code(short_code, permutation=None):
+    """Turn a generated short code back into its URL ID"""
+    number = from_base62(short_code)
+    if len(short_code) > CODE_LENGTH:
+        return number
+    if permutation:
+        number = permutation.unpermute(number)
+    return number
+
+
+class IdAllocator:
+    """Hands out URL IDs from blocks reserved in the sequences table
+    
+    Each process reserves block_size IDs with one short transaction and then
+    allocates from memory, so concurrent processes never hand out the same
+    ID. IDs left in a block when a process exits are never used.
+    """
+    
+    def __init__(self, db_name, block_size=ID_BLOCK_SIZE):
+        self.db_name = db_name
+        self.block_size = block_size
+        self._next = self._end = 0
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+    
+    def next_id(self):
+        with self._lock:
+            # A forked child must not reuse its parent's block
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._next = self._end = 0
+            if self._next >= self._end:
+                self._reserve()
+            url_id = self._next
+            self._next += 1
+            return url_id
+    
+    def next_ids(self, count):
+        """Allocate count IDs, reserving at most one more block for them"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._next = self._end = 0
+            ids = list(range(self._next, min(self._next + count, self._end)))
+            self._next += len(ids)
+            if len(ids) < count:
+                self._reserve(max(self.block_size, count - len(ids)))
+                start = self._next
+                self._next += count - len(ids)
+                ids.extend(range(start, self._next))
+            return ids
+    
+    def _reserve(self, size=None):
+        size = size or self.block_size
+        conn = sqlite3.connect(self.db_name, timeout=30)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            start = conn.execute("SELECT next_id FROM sequences WHERE name = 'urls'").fetchone()[0]
+            conn.execute("UPDATE sequences SET next_id = ? WHERE name = 'urls'", (start + size,))
+            conn.commit()
+        finally:
+            conn.close()
+        self._next, self._end = start, start + size
+
 class URLShortener:
-    def __init__(self, db_name='url_shortener.db'):
+    def __init__(self, db_name='url_shortener.db', permute_codes=True, id_block_size=ID_BLOCK_SIZE,
+                 cache_size=LINK_CACHE_SIZE, click_policy='drop', shards=1, storage=None, code_secret=None):
         self.db_name = db_name
+        self.permute_codes = permute_codes
+        # shards > 1 spreads links over that many files (see storage.py)
+        self.storage = storage or open_storage(db_name, shards)
         self.init_db()
+        self.permutation = CodePermutation(self.load_code_secret(code_secret)) if permute_codes else None
+        self.ids = IdAllocator(self.storage.sequence_db, id_block_size)
+        # cache_size=0 sends every lookup to the database
+        self.cache = LinkCache(cache_size) if cache_size else None
+        self.clicks = self.storage.click_recorder(policy=click_policy)
     
     def init_db(self):
-        """Initialize the database"""
-        conn = sqlite3.connect(self.db_name)
+        """Initialize the database, or every shard of it"""
+        for index in range(self.storage.shard_count):
+            conn = self.storage.connect_shard(index)
+            try:
+                self.init_shard(conn)
+                self.storage.check_shard(conn, index)
+            finally:
+                conn.close()
+    
+    def init_shard(self, conn):
+        """Create the tables of one database file"""
         c = conn.cursor()
         
+        # WAL lets redirects read while the click writer commits
+        c.execute('PRAGMA journal_mode = WAL')
+        
         # Create URLs table
         c.execute('''CREATE TABLE IF NOT EXISTS urls
                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -33,52 +280,191 @@ class URLShortener:
                       referrer TEXT)''')
         
         conn.commit()
-        conn.close()
+        self.migrate_db(conn)
+    
+    def migrate_db(self, conn):
+        """Apply pending schema migrations
+        
+        Each migration runs in an explicit transaction with its user_version
+        bump. sqlite3 would otherwise run DDL such as ALTER TABLE outside
+        any transaction, so a migration interrupted partway left changes
+        that the next startup tried to apply again. BEGIN IMMEDIATE also
+        keeps processes starting together from applying one twice.
+        """
+        while conn.execute('PRAGMA user_version').fetchone()[0] < len(MIGRATIONS):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Another process may have migrated since the check above
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+                if version < len(MIGRATIONS):
+                    for statement in MIGRATIONS[version]:
+                        conn.execute(statement)
+                    # PRAGMA does not accept bound parameters
+                    conn.execute(f'PRAGMA user_version = {version + 1}')
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+    
+    def load_code_secret(self, code_secret=None):
+        """The secret that scrambles IDs into codes
+        
+        code_secret, else the URL_SHORTENER_CODE_SECRET environment variable,
+        else the one stored with the ID sequence, generated on first use.
+        """
+        code_secret = code_secret or os.environ.get(CODE_SECRET_ENV)
+        if code_secret:
+            return code_secret
+        conn = self.storage.connect_shard(0, timeout=30)
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE name = 'code_secret'").fetchone()
+            if row is None:
+                # Processes starting together keep whichever secret got in first
+                with conn:
+                    conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('code_secret', ?)",
+                                 (secrets.token_hex(16),))
+                row = conn.execute("SELECT value FROM meta WHERE name = 'code_secret'").fetchone()
+            return row[0]
+        finally:
+            conn.close()
+    
+    def decode_code(self, short_code):
+        """The URL ID a generated short code stands for"""
+        return decode_code(short_code, self.permutation)
     
     def is_valid_url(self, url):
         """Check if URL is valid"""
         return validators.url(url)
     
-    def generate_short_code(self, url, length=6):
-        """Generate a short code for the URL"""
-        # Use hash of URL plus random characters for uniqueness
-        url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
-        random_chars = ''.join(random.choices(string.ascii_letters + string.digits, k=length-4))
-        return url_hash[:4] + random_chars
+    def generate_short_code(self):
+        """Generate the next short code, returning (url_id, short_code)"""
+        url_id = self.ids.next_id()
+        return url_id, encode_id(url_id, self.permutation)
     
     def shorten_url(self, original_url, custom_code=None):
-        """Shorten a URL"""
+        """Shorten a URL
+        
+        Generated codes come from IDs reserved in advance, so no lookup is
+        needed: the INSERT itself is the only database round trip.
+        """
         if not self.is_valid_url(original_url):
             return None, "Invalid URL"
         
-        if custom_code:
-            # Check if custom code is available
-            if self.get_original_url(custom_code):
-                return None, "Custom code already exists"
-            short_code = custom_code
-        else:
-            # Generate unique short code
-            while True:
-                short_code = self.generate_short_code(original_url)
-                if not self.get_original_url(short_code):
-                    break
-        
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        while True:
+            # Take the ID before writing: reserving a new block needs the write lock
+            if custom_code:
+                url_id, short_code = self.ids.next_id(), custom_code
+            else:
+                url_id, short_code = self.generate_short_code()
+            
+            conn = self.storage.connect(short_code)
+            try:
+                conn.execute('INSERT INTO urls (id, original_url, short_code) VALUES (?, ?, ?)',
+                             (url_id, original_url, short_code))
+                conn.commit()
+                if self.cache:
+                    # The code may be cached as missing
+                    self.cache.invalidate(short_code)
+                return short_code, None
+            except sqlite3.IntegrityError:
+                if custom_code:
+                    return None, "Custom code already exists"
+                # Taken by a custom code; move on to the next ID
+            finally:
+                conn.close()
+    
+    def shorten_many(self, urls, workers=None):
+        """Shorten many URLs at once, reusing the codes of known URLs
         
+        Returns a dict of URL -> short code, with None for invalid URLs.
+        Each distinct URL gets one code: an existing link to it when there
+        is one (the oldest), otherwise a new link. Only unknown URLs are
+        validated, spread over workers processes (default: CPUs), and all
+        new links are written in one transaction (one per shard).
+        """
+        codes = dict.fromkeys(urls)
+        # A URL's links can be in any shard, so look in all of them
+        conns = [self.storage.connect_shard(index, timeout=30) for index in range(self.storage.shard_count)]
         try:
-            c.execute('INSERT INTO urls (original_url, short_code) VALUES (?, ?)',
-                      (original_url, short_code))
-            conn.commit()
-            return short_code, None
-        except sqlite3.IntegrityError:
-            return None, "Short code already exists"
+            codes.update(self._find_codes(conns, list(codes)))
+            unknown = [url for url, code in codes.items() if code is None]
+            new_urls = [url for url, valid in zip(unknown, self._validate_many(unknown, workers)) if valid]
+            
+            while new_urls:
+                # Reserve IDs before taking the write lock, which reserving needs
+                ids = self.ids.next_ids(len(new_urls))
+                # Always lock shards in the same order, so bulk writers can't deadlock
+                for conn in conns:
+                    conn.execute('BEGIN IMMEDIATE')
+                # Another process may have added some of them meanwhile
+                existing = self._find_codes(conns, new_urls)
+                codes.update(existing)
+                rows = [(url_id, url, encode_id(url_id, self.permutation))
+                        for url_id, url in zip(ids, (url for url in new_urls if url not in existing))]
+                shard_rows = [[] for _ in conns]
+                for row in rows:
+                    shard_rows[self.storage.shard_index(row[2])].append(row)
+                for conn, batch in zip(conns, shard_rows):
+                    # A generated code can clash with a custom one; those rows are skipped
+                    conn.executemany('INSERT OR IGNORE INTO urls (id, original_url, short_code) VALUES (?, ?, ?)',
+                                     batch)
+                inserted = self._find_codes(conns, [url for _, url, _ in rows])
+                for conn in conns:
+                    conn.commit()
+                
+                codes.update(inserted)
+                if self.cache:
+                    for short_code in inserted.values():
+                        self.cache.invalidate(short_code)
+                # Retry the skipped ones with fresh IDs
+                new_urls = [url for _, url, _ in rows if url not in inserted]
         finally:
-            conn.close()
+            for conn in conns:
+                conn.close()
+        return codes
+    
+    @staticmethod
+    def _validate_many(urls, workers=None):
+        chunks = [urls[start:start + VALIDATION_CHUNK_SIZE]
+                  for start in range(0, len(urls), VALIDATION_CHUNK_SIZE)]
+        workers = workers or os.cpu_count() or 1
+        if workers > 1 and len(chunks) > 1:
+            with Pool(min(workers, len(chunks))) as pool:
+                results = pool.map(validate_urls, chunks)
+        else:
+            results = map(validate_urls, chunks)
+        return [valid for chunk in results for valid in chunk]
+    
+    @staticmethod
+    def _find_codes(conns, urls):
+        """Map each URL that already has a link to its oldest short code"""
+        found = {}
+        for start in range(0, len(urls), LOOKUP_CHUNK_SIZE):
+            chunk = urls[start:start + LOOKUP_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            for conn in conns:
+                # SQLite takes short_code from the row holding MIN(id)
+                for url, url_id, code in conn.execute(
+                        f'''SELECT original_url, MIN(id), short_code FROM urls
+                            WHERE original_url IN ({placeholders}) GROUP BY original_url''', chunk):
+                    if url not in found or url_id < found[url][0]:
+                        found[url] = (url_id, code)
+        return {url: code for url, (_, code) in found.items()}
     
     def get_original_url(self, short_code):
         """Get original URL from short code"""
-        conn = sqlite3.connect(self.db_name)
+        if self.cache:
+            original_url = self.cache.get(short_code)
+            if original_url is not MISS:
+                return original_url
+        
+        original_url = self._lookup_url(short_code)
+        if self.cache:
+            self.cache.put(short_code, original_url)
+        return original_url
+    
+    def _lookup_url(self, short_code):
+        conn = self.storage.connect(short_code)
         c = conn.cursor()
         
         c.execute('SELECT original_url FROM urls WHERE short_code = ?', (short_code,))
@@ -88,63 +474,162 @@ class URLShortener:
         return result[0] if result else None
     
     def record_click(self, short_code, ip_address=None, user_agent=None, referrer=None):
-        """Record a click for analytics"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        """Record a click for analytics
         
-        # Update click count
-        c.execute('UPDATE urls SET clicks = clicks + 1 WHERE short_code = ?', (short_code,))
-        
-        # Record analytics
-        c.execute('''INSERT INTO analytics (short_code, ip_address, user_agent, referrer)
-                     VALUES (?, ?, ?, ?)''',
-                  (short_code, ip_address, user_agent, referrer))
-        
-        conn.commit()
-        conn.close()
+        The click is queued and written by a background thread shortly after
+        (see clicks.py), so this never waits on the database. Returns False
+        if the queue was full and the click was dropped.
+        """
+        return self.clicks.record(short_code, ip_address, user_agent, referrer)
+    
+    def flush_clicks(self):
+        """Wait until all recorded clicks are in the database"""
+        self.clicks.flush()
     
     def get_click_stats(self, short_code):
         """Get click statistics for a short URL"""
-        conn = sqlite3.connect(self.db_name)
+        # Include this process's clicks that are still queued
+        self.flush_clicks()
+        
+        conn = self.storage.connect(short_code)
         c = conn.cursor()
         
         # Get total clicks
         c.execute('SELECT clicks FROM urls WHERE short_code = ?', (short_code,))
-        total_clicks = c.fetchone()[0] if c.fetchone() else 0
+        row = c.fetchone()
+        total_clicks = row[0] if row else 0
         
-        # Get recent clicks (last 24 hours)
-        c.execute('''SELECT COUNT(*) FROM analytics 
-                     WHERE short_code = ? AND click_time > datetime('now', '-1 day')''',
+        # Get recent clicks (last 24 hours), from at most 1,440 minute rollups
+        c.execute('''SELECT COALESCE(SUM(clicks), 0) FROM click_rollups
+                     WHERE short_code = ? AND granularity = 'minute'
+                       AND bucket > strftime('%Y-%m-%d %H:%M', 'now', '-1 day')''',
                   (short_code,))
         daily_clicks = c.fetchone()[0]
         
         conn.close()
         return total_clicks, daily_clicks
     
-    def get_all_urls(self):
-        """Get all shortened URLs"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+    def get_click_series(self, short_code, granularity='hour', since=None, until=None):
+        """Get clicks per minute, hour or day as a list of (bucket, clicks)
         
-        c.execute('SELECT short_code, original_url, clicks, created_at FROM urls ORDER BY created_at DESC')
-        urls = c.fetchall()
+        Buckets are UTC labels such as '2024-05-01 13:00' for hours; since
+        and until are optional labels in the same format. Buckets without
+        clicks are left out.
+        """
+        if granularity not in BUCKET_FORMATS:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        self.flush_clicks()
         
+        query = '''SELECT bucket, clicks FROM click_rollups
+                   WHERE short_code = ? AND granularity = ?'''
+        params = [short_code, granularity]
+        if since:
+            query += ' AND bucket >= ?'
+            params.append(since)
+        if until:
+            query += ' AND bucket <= ?'
+            params.append(until)
+        
+        conn = self.storage.connect(short_code)
+        series = conn.execute(query + ' ORDER BY bucket', params).fetchall()
+        conn.close()
+        return series
+    
+    def get_top_referrers(self, short_code, limit=10, days=30):
+        """Get the most common referrers of the last days, as (referrer, clicks)"""
+        return self._top_sources(short_code, 'referrer', limit, days)
+    
+    def get_top_user_agents(self, short_code, limit=10, days=30):
+        """Get the most common user agents of the last days, as (user_agent, clicks)"""
+        return self._top_sources(short_code, 'user_agent', limit, days)
+    
+    def _top_sources(self, short_code, kind, limit, days):
+        self.flush_clicks()
+        conn = self.storage.connect(short_code)
+        top = conn.execute('''SELECT value, SUM(clicks) AS total FROM click_sources
+                              WHERE short_code = ? AND kind = ? AND day >= date('now', ?)
+                              GROUP BY value ORDER BY total DESC, value LIMIT ?''',
+                           (short_code, kind, f'-{days} days', limit)).fetchall()
         conn.close()
+        return top
+    
+    def compact_analytics(self, raw_days=RAW_CLICK_RETENTION_DAYS,
+                          minute_days=MINUTE_ROLLUP_RETENTION_DAYS, hour_days=HOUR_ROLLUP_RETENTION_DAYS):
+        """Delete raw clicks and fine-grained rollups past their retention
+        
+        Every click is counted in the rollups when it is written, so old raw
+        rows can go without losing totals, series or top sources. Deletes run
+        in small batches so the click writer isn't blocked for long. Returns
+        the number of raw clicks deleted.
+        """
+        self.flush_clicks()
+        deleted = 0
+        for index in range(self.storage.shard_count):
+            conn = self.storage.connect_shard(index, timeout=30)
+            try:
+                deleted += self._delete_in_batches(
+                    conn, '''DELETE FROM analytics WHERE id IN
+                             (SELECT id FROM analytics WHERE click_time < datetime('now', ?) LIMIT ?)''',
+                    f'-{raw_days} days')
+                for granularity, days in (('minute', minute_days), ('hour', hour_days)):
+                    # Bucket labels sort like timestamps. The table has no
+                    # rowid, so batches are picked by primary key.
+                    self._delete_in_batches(
+                        conn, '''DELETE FROM click_rollups WHERE (short_code, granularity, bucket) IN
+                                 (SELECT short_code, granularity, bucket FROM click_rollups
+                                  WHERE granularity = ? AND bucket < strftime(?, 'now', ?) LIMIT ?)''',
+                        granularity, BUCKET_FORMATS[granularity], f'-{days} days')
+            finally:
+                conn.close()
+        return deleted
+    
+    @staticmethod
+    def _delete_in_batches(conn, statement, *params):
+        deleted = 0
+        while True:
+            with conn:
+                count = conn.execute(statement, params + (COMPACT_BATCH_SIZE,)).rowcount
+            deleted += count
+            if count < COMPACT_BATCH_SIZE:
+                return deleted
+    
+    def get_all_urls(self):
+        """Get all shortened URLs"""
+        urls = []
+        for index in range(self.storage.shard_count):
+            conn = self.storage.connect_shard(index)
+            c = conn.cursor()
+            
+            c.execute('SELECT short_code, original_url, clicks, created_at FROM urls ORDER BY created_at DESC')
+            urls.extend(c.fetchall())
+            
+            conn.close()
+        if self.storage.shard_count > 1:
+            urls.sort(key=lambda url: url[3], reverse=True)
         return urls
     
     def delete_url(self, short_code):
         """Delete a shortened URL"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self.storage.connect(short_code)
         c = conn.cursor()
         
         # Delete from both tables
         c.execute('DELETE FROM urls WHERE short_code = ?', (short_code,))
+        deleted = c.rowcount > 0
         c.execute('DELETE FROM analytics WHERE short_code = ?', (short_code,))
+        c.execute('DELETE FROM click_rollups WHERE short_code = ?', (short_code,))
+        c.execute('DELETE FROM click_sources WHERE short_code = ?', (short_code,))
         
         conn.commit()
         conn.close()
         
-        return c.rowcount > 0
+        if self.cache:
+            self.cache.invalidate(short_code)
+        return deleted
+    
+    def get_cache_stats(self):
+        """Get hit/miss counters of the redirect cache"""
+        return self.cache.stats() if self.cache else {}
 
 def main():
     """Main function"""
@@ -157,9 +642,11 @@ def main():
         print("3. View all URLs")
         print("4. Get click statistics")
         print("5. Delete URL")
-        print("6. Exit")
+        print("6. Compact analytics")
+        print("7. Shorten URLs from file")
+        print("8. Exit")
         
-        choice = input("\nEnter your choice (1-6): ").strip()
+        choice = input("\nEnter your choice (1-8): ").strip()
         
         if choice == "1":
             url = input("Enter URL to shorten: ").strip()
@@ -195,6 +682,12 @@ def main():
             total_clicks, daily_clicks = shortener.get_click_stats(short_code)
             print(f"Total clicks: {total_clicks}")
             print(f"Daily clicks: {daily_clicks}")
+            
+            referrers = shortener.get_top_referrers(short_code, limit=5)
+            if referrers:
+                print("Top referrers (30 days):")
+                for referrer, clicks in referrers:
+                    print(f"  {clicks:6} {referrer}")
         
         elif choice == "5":
             short_code = input("Enter short code to delete: ").strip()
@@ -204,6 +697,24 @@ def main():
                 print("URL not found")
         
         elif choice == "6":
+            deleted = shortener.compact_analytics()
+            print(f"Removed {deleted} raw clicks older than {RAW_CLICK_RETENTION_DAYS} days")
+        
+        elif choice == "7":
+            filename = input("Enter file with one URL per line: ").strip()
+            try:
+                with open(filename, encoding='utf-8') as f:
+                    urls = [line.strip() for line in f if line.strip()]
+            except OSError as e:
+                print(f"Error reading file: {e}")
+                continue
+            codes = shortener.shorten_many(urls)
+            invalid = sum(1 for code in codes.values() if code is None)
+            print(f"Shortened {len(codes) - invalid} URLs ({invalid} invalid)")
+            for url, code in codes.items():
+                print(f"{code or 'INVALID':8} -> {url}")
+        
+        elif choice == "8":
             print("Goodbye!")
             break
         
@@ -0,0 +1,204 @@
+"""HTTP redirect server for the URL shortener.
+
+Answers ``GET /<short_code>`` with a redirect to the original URL. Codes are
+resolved through each worker's in-memory link cache; only cache misses touch
+SQLite, and those run in a thread pool so they don't stall the event loop.
+Clicks are handed to the buffered click recorder and written in the
+background. Connections are kept alive (HTTP/1.1).
+
+Each worker process binds the same port with SO_REUSEPORT and the kernel
+spreads connections between them. uvloop is used when it is installed.
+
+    python server.py --port 8080 --workers 4
+    python server.py --status 301      # permanent redirects
+"""
+import argparse
+import asyncio
+import multiprocessing
+import signal
+import socket
+
+from link_cache import MISS
+from main import URLShortener
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Longest request head (request line and headers) accepted
+MAX_HEAD_SIZE = 16 * 1024
+
+REASONS = {
+    301: 'Moved Permanently',
+    302: 'Found',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    431: 'Request Header Fields Too Large',
+}
+
+
+def build_response(status, location=None, body=b'', keep_alive=True):
+    head = [f'HTTP/1.1 {status} {REASONS[status]}']
+    if location:
+        head.append(f'Location: {location}')
+    if status == 405:
+        head.append('Allow: GET, HEAD')
+    head.append(f'Content-Length: {len(body)}')
+    if not keep_alive:
+        head.append('Connection: close')
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+
+def parse_head(head):
+    """Split a request head into (method, path, version, headers)"""
+    lines = head.decode('latin-1').split('\r\n')
+    method, path, version = lines[0].split(' ', 2)
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    return method, path, version, headers
+
+
+class RedirectServer:
+    """Serves redirects for one worker process"""
+
+    def __init__(self, shortener, status=302, trust_forwarded=False):
+        self.shortener = shortener
+        self.status = status
+        # Only honour X-Forwarded-For when a proxy we control sets it
+        self.trust_forwarded = trust_forwarded
+
+    async def resolve(self, short_code):
+        cache = self.shortener.cache
+        original_url = cache.get(short_code) if cache else MISS
+        if original_url is MISS:
+            # Blocking SQLite lookup; keep it off the event loop. Not through
+            # get_original_url, which would count the miss in the cache twice.
+            loop = asyncio.get_running_loop()
+            original_url = await loop.run_in_executor(None, self.shortener._lookup_url, short_code)
+            if cache:
+                cache.put(short_code, original_url)
+        return original_url
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        client_ip = peer[0] if peer else None
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(build_response(431, keep_alive=False))
+                    break
+
+                try:
+                    method, path, version, headers = parse_head(head)
+                except ValueError:
+                    writer.write(build_response(400, keep_alive=False))
+                    break
+
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close') or \
+                    headers.get('connection', '').lower() == 'keep-alive'
+
+                if method not in ('GET', 'HEAD'):
+                    # The request body is never read, so the connection can't be reused
+                    writer.write(build_response(405, keep_alive=False))
+                    keep_alive = False
+                else:
+                    short_code = path.split('?', 1)[0].lstrip('/')
+                    original_url = await self.resolve(short_code) if short_code else None
+                    if original_url is None:
+                        body = b'Short code not found\n' if method == 'GET' else b''
+                        writer.write(build_response(404, body=body, keep_alive=keep_alive))
+                    else:
+                        # Stored URLs are validated, but never let one inject headers
+                        location = original_url.replace('\r', '').replace('\n', '')
+                        writer.write(build_response(self.status, location, keep_alive=keep_alive))
+                        if method == 'GET':
+                            ip_address = client_ip
+                            if self.trust_forwarded and headers.get('x-forwarded-for'):
+                                # The first address is the original client
+                                ip_address = headers['x-forwarded-for'].split(',')[0].strip()
+                            self.shortener.record_click(short_code, ip_address,
+                                                        headers.get('user-agent'), headers.get('referer'))
+
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host, port, db_name, shards, status, reuse_port, trust_forwarded=False):
+    shortener = URLShortener(db_name, shards=shards)
+    server = RedirectServer(shortener, status, trust_forwarded)
+    listener = await asyncio.start_server(server.handle, host, port, reuse_port=reuse_port,
+                                          limit=MAX_HEAD_SIZE, backlog=1024)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+
+    async with listener:
+        await stop.wait()
+    # Write the clicks still queued in this worker
+    shortener.clicks.close()
+
+
+def run_worker(host, port, db_name, shards, status, reuse_port, trust_forwarded=False):
+    if uvloop:
+        uvloop.install()
+    asyncio.run(serve(host, port, db_name, shards, status, reuse_port, trust_forwarded))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve short code redirects')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='port to listen on')
+    parser.add_argument('--db', default='url_shortener.db', help='shortener database')
+    parser.add_argument('--shards', type=int, default=1, help='database shards (see split_db.py)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes sharing the port')
+    parser.add_argument('--status', type=int, choices=(301, 302), default=302,
+                        help='redirect status; 301 lets browsers cache it, so fewer clicks are counted')
+    parser.add_argument('--trust-forwarded', action='store_true',
+                        help='record the client address from X-Forwarded-For (only behind a trusted proxy)')
+    args = parser.parse_args()
+
+    if args.workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        parser.error("multiple workers need SO_REUSEPORT, which this platform lacks")
+
+    # Create the schema once, before workers race to migrate it
+    URLShortener(args.db, shards=args.shards).clicks.close()
+    print(f"Serving redirects on http://{args.host}:{args.port}/ with {args.workers} worker(s)"
+          f"{' (uvloop)' if uvloop else ''}")
+
+    if args.workers == 1:
+        run_worker(args.host, args.port, args.db, args.shards, args.status, False, args.trust_forwarded)
+        return
+
+    workers = [multiprocessing.Process(target=run_worker,
+                                       args=(args.host, args.port, args.db, args.shards, args.status, True,
+                                             args.trust_forwarded))
+               for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Ctrl+C reaches the workers too; wait for them to flush their clicks
+        for worker in workers:
+            worker.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Split a URL shortener database into shards.
+
+Copies every link, with its raw clicks, rollups and click sources, into the
+shard its short code hashes to, and carries the ID sequence and the
+secret that scrambles codes over to the first shard, so new codes don't
+repeat old ones. The source database is left untouched; stop writers while
+splitting, then start them with the same shard count:
+
+    python split_db.py --db url_shortener.db --shards 8
+    python server.py --db url_shortener.db --shards 8
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+from main import URLShortener
+from storage import ShardedSQLiteStorage
+
+# Tables whose rows belong to a short code, and the columns copied
+SHARDED_TABLES = {
+    'urls': 'id, original_url, short_code, created_at, clicks',
+    'analytics': 'id, short_code, click_time, ip_address, user_agent, referrer',
+    'click_rollups': 'short_code, granularity, bucket, clicks',
+    'click_sources': 'short_code, day, kind, value, clicks',
+}
+
+
+def split_database(db_name, shard_count):
+    """Copy db_name into shard_count shards; returns links copied per shard"""
+    storage = ShardedSQLiteStorage(db_name, shard_count)
+    existing = [name for name in storage.shard_names if os.path.exists(name)]
+    if existing:
+        raise FileExistsError(f"Shard files already exist: {', '.join(existing)}")
+
+    # Bring the source schema up to date, then create the empty shards
+    URLShortener(db_name, cache_size=0)
+    URLShortener(db_name, cache_size=0, storage=storage)
+
+    conn = sqlite3.connect(db_name)
+    conn.create_function('shard_index', 1, storage.shard_index, deterministic=True)
+    counts = []
+    try:
+        for index, shard_name in enumerate(storage.shard_names):
+            conn.execute('ATTACH DATABASE ? AS shard', (shard_name,))
+            with conn:
+                for table, columns in SHARDED_TABLES.items():
+                    conn.execute(f'''INSERT INTO shard.{table} ({columns})
+                                     SELECT {columns} FROM main.{table} WHERE shard_index(short_code) = ?''',
+                                 (index,))
+                if index == 0:
+                    conn.execute('''UPDATE shard.sequences
+                                    SET next_id = MAX(next_id, (SELECT next_id FROM main.sequences WHERE name = 'urls'))
+                                    WHERE name = 'urls' ''')
+                    # Codes keep decoding, and new ones keep their scrambling
+                    conn.execute('''INSERT OR REPLACE INTO shard.meta (name, value)
+                                    SELECT name, value FROM main.meta WHERE name = 'code_secret' ''')
+            counts.append(conn.execute('SELECT COUNT(*) FROM shard.urls').fetchone()[0])
+            conn.execute('DETACH DATABASE shard')
+    finally:
+        conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Split a URL shortener database into shards')
+    parser.add_argument('--db', default='url_shortener.db', help='database to split')
+    parser.add_argument('--shards', type=int, required=True, help='number of shards (at least 2)')
+    args = parser.parse_args()
+
+    if args.shards < 2:
+        parser.error("--shards must be at least 2")
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} does not exist")
+
+    started = time.perf_counter()
+    try:
+        counts = split_database(args.db, args.shards)
+    except (FileExistsError, sqlite3.Error) as e:
+        print(f"Error splitting database: {e}")
+        return
+    for name, count in zip(ShardedSQLiteStorage(args.db, args.shards).shard_names, counts):
+        print(f"{name}: {count} links")
+    print(f"Split {sum(counts)} links into {args.shards} shards in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
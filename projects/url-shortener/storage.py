@@ -0,0 +1,95 @@
+"""Where URLShortener keeps its data.
+
+A storage decides which SQLite file holds each short code. Everything
+about a link (its urls row, raw clicks, rollups and click sources) lives in
+the same file, so every per-link operation touches one file only.
+
+SQLiteStorage keeps everything in one file. ShardedSQLiteStorage spreads
+links over N files by a hash of the short code; each file has its own write
+lock and its own click writer, so writes to different shards don't wait
+for each other. The ID sequence lives in the first shard.
+
+Each shard file records its position ('2/8'), so a shard is never opened
+with the wrong shard count or as a standalone database.
+"""
+import os
+import sqlite3
+import zlib
+
+from clicks import ClickRecorder, ShardedClickRecorder
+
+
+class SQLiteStorage:
+    """Everything in a single SQLite file"""
+
+    def __init__(self, db_name='url_shortener.db'):
+        self.db_name = db_name
+        self.shard_names = [db_name]
+
+    @property
+    def shard_count(self):
+        return len(self.shard_names)
+
+    @property
+    def sequence_db(self):
+        """The file holding the ID sequence"""
+        return self.shard_names[0]
+
+    def shard_index(self, short_code):
+        return 0
+
+    def connect(self, short_code, **kwargs):
+        """Open a connection to the file holding short_code"""
+        return sqlite3.connect(self.shard_names[self.shard_index(short_code)], **kwargs)
+
+    def connect_shard(self, index, **kwargs):
+        return sqlite3.connect(self.shard_names[index], **kwargs)
+
+    def click_recorder(self, **options):
+        return ClickRecorder(self.db_name, **options)
+
+    def check_shard(self, conn, index):
+        """Record this file's shard position, or raise ValueError if it differs"""
+        position = f'{index}/{self.shard_count}' if self.shard_count > 1 else None
+        row = conn.execute("SELECT value FROM meta WHERE name = 'shard'").fetchone()
+        if row is None and position:
+            with conn:
+                conn.execute("INSERT INTO meta (name, value) VALUES ('shard', ?)", (position,))
+        elif (row[0] if row else None) != position:
+            raise ValueError(f"{self.shard_names[index]} is shard {row[0] if row else 'none'}, "
+                             f"expected {position or 'an unsharded database'}")
+
+
+class ShardedSQLiteStorage(SQLiteStorage):
+    """Links spread over shard_count SQLite files by short code hash
+
+    Files are named after db_name: url_shortener.db with 4 shards is stored
+    as url_shortener.shard0.db to url_shortener.shard3.db.
+    """
+
+    def __init__(self, db_name='url_shortener.db', shard_count=4):
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        super().__init__(db_name)
+        self.shard_names = shard_names(db_name, shard_count)
+
+    def shard_index(self, short_code):
+        # crc32 rather than hash(): it must be the same in every process
+        return zlib.crc32(short_code.encode('utf-8')) % len(self.shard_names)
+
+    def click_recorder(self, **options):
+        return ShardedClickRecorder([ClickRecorder(name, **options) for name in self.shard_names],
+                                    self.shard_index)
+
+
+def shard_names(db_name, shard_count):
+    """File names of the shards of db_name"""
+    stem, ext = os.path.splitext(db_name)
+    return [f'{stem}.shard{index}{ext or ".db"}' for index in range(shard_count)]
+
+
+def open_storage(db_name='url_shortener.db', shards=1):
+    """Storage for db_name, sharded when shards > 1"""
+    if shards > 1:
+        return ShardedSQLiteStorage(db_name, shards)
+    return SQLiteStorage(db_name)